@@ -0,0 +1,315 @@
+"""
+Offline batch documentation for many repositories.
+
+Uses RepoProcessor, DocGenerator and CacheManager directly instead of the
+HTTP API. Repositories are spread over worker processes that share one LLM
+rate limit and one cache database, so already-cached repositories are
+skipped. Every finished repository is appended to a state file; running the
+same command again after an interruption resumes where it stopped.
+
+Usage (from the backend directory):
+    python batch.py https://github.com/org/repo /path/to/checkout
+    python batch.py --input repos.txt --workers 4 --report nightly.json
+    python batch.py --input repos.txt --restart   # ignore the previous run's state
+"""
+import os
+import sys
+import json
+import time
+import queue
+import asyncio
+import logging
+import argparse
+import multiprocessing
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+
+import config
+from services.reporting import environment_info, write_report
+
+logger = logging.getLogger('batch')
+
+# Results that count as done when resuming; failed repositories are retried
+DONE_STATUSES = ('generated', 'cached')
+
+
+def read_targets(repos: List[str], input_path: Optional[str]) -> List[str]:
+    """Repository URLs and local paths from the command line and an input file, deduplicated"""
+    targets = list(repos)
+    if input_path:
+        with open(input_path, encoding='utf-8') as f:
+            targets += [line.strip() for line in f if line.strip() and not line.startswith('#')]
+
+    seen = set()
+    unique = []
+    for target in targets:
+        # Local checkouts are keyed by absolute path so relative paths resume correctly
+        if os.path.isdir(target):
+            target = os.path.abspath(target)
+        if target not in seen:
+            seen.add(target)
+            unique.append(target)
+    return unique
+
+
+def load_state(path: str) -> Dict[str, Dict[str, Any]]:
+    """Last recorded result per repository from a previous run's state file"""
+    results = {}
+    if not os.path.exists(path):
+        return results
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            try:
+                result = json.loads(line)
+            except json.JSONDecodeError:
+                # A line cut short by an interruption
+                continue
+            results[result['repo']] = result
+    return results
+
+
+async def document_repository(services: Dict[str, Any], target: str, settings: Dict[str, Any]) -> Dict[str, Any]:
+    """Document one repository, unless a fresh copy is already cached"""
+    from services.budget import JobBudget
+    from services.cancellation import CancellationToken
+
+    cache_manager = services['cache_manager']
+    doc_generator = services['doc_generator']
+    llm_stats = doc_generator.llm.stats
+    before = dict(llm_stats)
+    start = time.perf_counter()
+    result = {'repo': target, 'worker': os.getpid(), 'started_at': datetime.now().isoformat()}
+
+    try:
+        cache_key = cache_manager.get_cache_key(target)
+        if not settings['force'] and await cache_manager.get_cached_result(cache_key):
+            result['status'] = 'cached'
+            return result
+
+        token = CancellationToken(settings['job_timeout'] or None)
+        repo_data = await services['repo_processor'].process_repository(target, cancel_token=token)
+        result['process_seconds'] = round(time.perf_counter() - start, 3)
+        budget = JobBudget(
+            max_llm_calls=settings['max_llm_calls'] or None,
+            max_tokens=settings['max_llm_tokens'] or None,
+            max_seconds=settings['max_seconds'] or None
+        )
+        doc_result = await doc_generator.generate_documentation(repo_data, cancel_token=token, budget=budget)
+        await cache_manager.cache_result(cache_key, doc_result)
+
+        result.update({
+            'status': 'generated',
+            'doc_path': os.path.join(doc_generator.output_dir, doc_result['file_path']),
+            'modules': repo_data['parsed_modules'],
+            'files': repo_data['total_files'],
+            'budget': budget.to_dict()
+        })
+        return result
+
+    except Exception as e:
+        logger.error(f"Failed to document {target}: {str(e)}")
+        result.update({'status': 'failed', 'error': f"{type(e).__name__}: {str(e)}"})
+        return result
+
+    finally:
+        result['seconds'] = round(time.perf_counter() - start, 3)
+        for key in ('requests', 'errors', 'prompt_tokens', 'completion_tokens'):
+            result[f'llm_{key}'] = llm_stats.get(key, 0) - before.get(key, 0)
+
+
+def _create_services(settings: Dict[str, Any], limiter) -> Dict[str, Any]:
+    from services.repo_processor import RepoProcessor
+    from services.doc_generator import DocGenerator
+    from services.cache_manager import CacheManager
+    from services.llm_client import create_backend
+    from services.prompts import PromptBuilder
+    from services.routing import SymbolRouter
+
+    return {
+        'repo_processor': RepoProcessor(),
+        'doc_generator': DocGenerator(
+            llm_backend=create_backend(settings['backend'], hedge_budget=settings['hedge_budget']),
+            output_dir=settings['output_dir'],
+            token_limiter=limiter,
+            call_timeout=settings['call_timeout'],
+            router=SymbolRouter(large_model=config.LLM_LARGE_MODEL, small_model=config.LLM_SMALL_MODEL),
+            lazy_symbols=settings['lazy'],
+            prompts=PromptBuilder(
+                context_tokens=config.LLM_CONTEXT_TOKENS,
+                max_prompt_tokens=config.LLM_MAX_PROMPT_TOKENS
+            )
+        ),
+        'cache_manager': CacheManager(
+            db_path=settings['cache_db'],
+            stale_seconds=config.CACHE_STALE_SECONDS,
+            cache_duration_days=config.CACHE_DURATION_DAYS
+        )
+    }
+
+
+async def _worker_loop(tasks, results, settings: Dict[str, Any], limiter):
+    services = _create_services(settings, limiter)
+    while True:
+        target = await asyncio.to_thread(tasks.get)
+        if target is None:
+            return
+        results.put(await document_repository(services, target, settings))
+
+
+def _worker_main(tasks, results, settings: Dict[str, Any], limiter):
+    """Worker process entry point: document repositories from `tasks` until a None arrives"""
+    logging.basicConfig(level=settings['log_level'], format='%(process)d %(levelname)s %(name)s: %(message)s')
+    try:
+        asyncio.run(_worker_loop(tasks, results, settings, limiter))
+    except KeyboardInterrupt:
+        pass
+
+
+def run_batch(targets: List[str], settings: Dict[str, Any], state_path: str) -> Dict[str, Any]:
+    """Document `targets` across worker processes and return the run report"""
+    from services.admission import SharedRateLimiter
+    from services.cache_manager import CacheManager
+
+    previous = load_state(state_path)
+    pending = [target for target in targets if previous.get(target, {}).get('status') not in DONE_STATUSES]
+    resumed = len(targets) - len(pending)
+    if resumed:
+        logger.info(f"Resuming: {resumed} of {len(targets)} repositories already done")
+
+    # Create the cache tables once before workers start writing to them
+    asyncio.run(CacheManager(db_path=settings['cache_db']).initialize())
+
+    context = multiprocessing.get_context('spawn')
+    limiter = SharedRateLimiter(settings['calls_per_minute'], settings['tokens_per_minute'], context=context)
+    tasks = context.Queue()
+    results = context.Queue()
+    for target in pending:
+        tasks.put(target)
+
+    worker_count = max(1, min(settings['workers'], len(pending)))
+    workers = [
+        context.Process(target=_worker_main, args=(tasks, results, settings, limiter), daemon=True)
+        for _ in range(worker_count if pending else 0)
+    ]
+    for _ in workers:
+        tasks.put(None)
+    for worker in workers:
+        worker.start()
+
+    start = time.perf_counter()
+    outcomes = {target: previous[target] for target in targets if target in previous}
+    remaining = set(pending)
+    interrupted = False
+    try:
+        with open(state_path, 'a', encoding='utf-8') as state:
+            while remaining:
+                try:
+                    result = results.get(timeout=1.0)
+                except queue.Empty:
+                    if not any(worker.is_alive() for worker in workers):
+                        for target in remaining:
+                            outcomes[target] = {'repo': target, 'status': 'failed', 'error': 'Worker exited unexpectedly'}
+                        break
+                    continue
+                remaining.discard(result['repo'])
+                outcomes[result['repo']] = result
+                state.write(json.dumps(result) + '\n')
+                state.flush()
+                logger.info(f"[{len(pending) - len(remaining)}/{len(pending)}] {result['status']}: {result['repo']}")
+    except KeyboardInterrupt:
+        interrupted = True
+        logger.warning(f"Interrupted with {len(remaining)} repositories left; rerun to resume")
+        for worker in workers:
+            worker.terminate()
+    for worker in workers:
+        worker.join(timeout=5)
+
+    repos = [outcomes[target] for target in targets if target in outcomes]
+    totals = {
+        'repos': len(targets),
+        'resumed': resumed,
+        'remaining': len(remaining) if interrupted else 0,
+        'elapsed_seconds': round(time.perf_counter() - start, 3)
+    }
+    for status in ('generated', 'cached', 'failed'):
+        totals[status] = sum(1 for repo in repos if repo['status'] == status)
+    for key in ('llm_requests', 'llm_errors', 'llm_prompt_tokens', 'llm_completion_tokens'):
+        totals[key] = sum(repo.get(key, 0) for repo in repos)
+
+    return {
+        'environment': environment_info(),
+        'settings': settings,
+        'interrupted': interrupted,
+        'totals': totals,
+        'repos': repos
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Generate documentation for many repositories offline")
+    parser.add_argument('repos', nargs='*', help="Repository URLs or local checkout paths")
+    parser.add_argument('--input', help="File with one repository URL or path per line")
+    parser.add_argument('--workers', type=int, default=min(4, os.cpu_count() or 1))
+    parser.add_argument('--output-dir', default=config.OUTPUT_DIR)
+    parser.add_argument('--cache-db', default=config.CACHE_DB_PATH)
+    parser.add_argument('--state', default='batch_state.jsonl', help="Progress file used to resume")
+    parser.add_argument('--restart', action='store_true', help="Discard the state of a previous run")
+    parser.add_argument('--report', default='batch_report.json', help="Run report path ('-' for stdout)")
+    parser.add_argument('--force', action='store_true', help="Regenerate repositories that are already cached")
+    parser.add_argument('--backend', default=config.LLM_BACKEND, help="LLM backend ('openai' or 'fake')")
+    parser.add_argument('--calls-per-minute', type=float, default=60,
+                        help="LLM calls per minute across all workers (0 = unlimited)")
+    parser.add_argument('--tokens-per-minute', type=float, default=90000,
+                        help="LLM tokens per minute across all workers (0 = unlimited)")
+    parser.add_argument('--hedge-budget', type=float, default=config.LLM_HEDGE_BUDGET)
+    parser.add_argument('--call-timeout', type=float, default=config.LLM_CALL_TIMEOUT_SECONDS)
+    parser.add_argument('--job-timeout', type=float, default=config.JOB_DEADLINE_SECONDS)
+    parser.add_argument('--max-llm-calls', type=int, default=config.JOB_MAX_LLM_CALLS)
+    parser.add_argument('--max-llm-tokens', type=int, default=config.JOB_MAX_LLM_TOKENS)
+    parser.add_argument('--max-seconds', type=float, default=config.JOB_BUDGET_SECONDS)
+    parser.add_argument('--lazy', action='store_true', default=config.LAZY_SYMBOL_DOCS,
+                        help="Defer LLM-written symbol docs until they are requested")
+    parser.add_argument('--log-level', default='INFO')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=args.log_level, format='%(levelname)s %(name)s: %(message)s')
+    targets = read_targets(args.repos, args.input)
+    if not targets:
+        parser.error("no repositories given")
+
+    if args.restart and os.path.exists(args.state):
+        os.remove(args.state)
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    settings = {
+        'workers': args.workers,
+        'output_dir': args.output_dir,
+        'cache_db': args.cache_db,
+        'force': args.force,
+        'backend': args.backend,
+        'calls_per_minute': args.calls_per_minute,
+        'tokens_per_minute': args.tokens_per_minute,
+        'hedge_budget': args.hedge_budget,
+        'call_timeout': args.call_timeout,
+        'job_timeout': args.job_timeout,
+        'max_llm_calls': args.max_llm_calls,
+        'max_llm_tokens': args.max_llm_tokens,
+        'max_seconds': args.max_seconds,
+        'lazy': args.lazy,
+        'log_level': args.log_level
+    }
+    report = run_batch(targets, settings, args.state)
+    write_report(report, None if args.report == '-' else args.report)
+
+    totals = report['totals']
+    logger.info(
+        f"{totals['generated']} generated, {totals['cached']} cached, {totals['failed']} failed, "
+        f"{totals['resumed']} resumed; {totals['llm_requests']} LLM calls in {totals['elapsed_seconds']}s"
+    )
+    if report['interrupted']:
+        return 130
+    return 1 if totals['failed'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,198 @@
+"""
+End-to-end pipeline benchmark.
+
+Runs RepoProcessor.process_repository -> DocGenerator.generate_documentation
+-> HTML over synthetic repositories of increasing size, using the
+deterministic FakeLLMBackend so no network access or API key is needed.
+
+Each size runs in a fresh interpreter so peak RSS is measured per size.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_pipeline --sizes 10 100 1000 --out bench.json
+    python -m benchmarks.bench_pipeline --compare bench.json
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import asyncio
+import argparse
+import resource
+import tempfile
+import subprocess
+from typing import Dict, Any, List
+
+from .synthetic_repo import generate_repo
+from .reporting import environment_info, write_report, load_report, compare_metrics, print_comparison
+
+DEFAULT_SIZES = [10, 100, 1000, 10000]
+
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and kilobytes on Linux
+    if sys.platform == 'darwin':
+        return round(peak / (1024 * 1024), 2)
+    return round(peak / 1024, 2)
+
+
+async def run_pipeline(
+    repo_path: str,
+    output_dir: str,
+    fake_config: Dict[str, Any],
+    budget_config: Dict[str, Any] = None
+) -> Dict[str, Any]:
+    """Run the full pipeline once over a local repository and collect measurements"""
+    from services.budget import JobBudget
+    from services.metrics import Metrics
+    from services.llm_client import FakeLLMBackend
+    from services.repo_processor import RepoProcessor
+    from services.doc_generator import DocGenerator
+
+    metrics = Metrics()
+    backend = FakeLLMBackend.from_config(fake_config)
+    repo_processor = RepoProcessor(metrics=metrics)
+    doc_generator = DocGenerator(llm_backend=backend, output_dir=output_dir, metrics=metrics)
+
+    start = time.perf_counter()
+    repo_data = await repo_processor.process_repository(repo_path)
+    budget = JobBudget(**budget_config) if budget_config else None
+    result = await doc_generator.generate_documentation(repo_data, budget=budget)
+    total = time.perf_counter() - start
+
+    html_path = os.path.join(output_dir, result['file_path'])
+    snapshot = metrics.snapshot()
+    return {
+        'total_seconds': round(total, 6),
+        'stages': snapshot['timings'],
+        'counters': snapshot['counters'],
+        'llm': dict(backend.stats),
+        'modules': repo_data['parsed_modules'],
+        'files': repo_data['total_files'],
+        'symbols': sum(len(m['symbols']) for m in repo_data['modules']),
+        'html_bytes': os.path.getsize(html_path),
+        'peak_rss_mb': _peak_rss_mb()
+    }
+
+
+def _run_single(args) -> Dict[str, Any]:
+    """Child-process entry point: benchmark one pre-generated repository"""
+    import logging
+    logging.disable(logging.CRITICAL)
+
+    output_dir = tempfile.mkdtemp(prefix='bench_out_')
+    try:
+        return asyncio.run(run_pipeline(
+            args.repo, output_dir, json.loads(args.fake_config), json.loads(args.budget_config)
+        ))
+    finally:
+        shutil.rmtree(output_dir, ignore_errors=True)
+
+
+def run_size(
+    size: int,
+    seed: int,
+    fake_config: Dict[str, Any],
+    budget_config: Dict[str, Any] = None
+) -> Dict[str, Any]:
+    """Generate a synthetic repo of `size` modules and benchmark it in a subprocess"""
+    repo_dir = tempfile.mkdtemp(prefix=f'bench_repo_{size}_')
+    try:
+        generate_repo(repo_dir, size, seed)
+        backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        proc = subprocess.run(
+            [sys.executable, '-m', 'benchmarks.bench_pipeline', '--single',
+             '--repo', repo_dir, '--fake-config', json.dumps(fake_config),
+             '--budget-config', json.dumps(budget_config or {})],
+            capture_output=True, text=True, cwd=backend_dir
+        )
+        if proc.returncode != 0:
+            raise RuntimeError(f"Benchmark for size {size} failed:\n{proc.stderr}")
+        result = json.loads(proc.stdout)
+        result['size'] = size
+        return result
+    finally:
+        shutil.rmtree(repo_dir, ignore_errors=True)
+
+
+def flatten(report: Dict[str, Any]) -> Dict[str, float]:
+    """Flatten a report into `<size>.<metric>` pairs for comparison"""
+    flat = {}
+    for run in report['runs']:
+        prefix = str(run['size'])
+        flat[f"{prefix}.total_seconds"] = run['total_seconds']
+        flat[f"{prefix}.peak_rss_mb"] = run['peak_rss_mb']
+        flat[f"{prefix}.llm_requests"] = run['llm']['requests']
+        for stage, seconds in run['stages'].items():
+            flat[f"{prefix}.{stage}"] = seconds
+    return flat
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description="End-to-end documentation pipeline benchmark")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES,
+                        help="Number of modules in each synthetic repository")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--latency-ms', type=float, default=0.0, help="Fake LLM mean latency")
+    parser.add_argument('--latency-jitter-ms', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Fake LLM failure probability")
+    parser.add_argument('--output-ratio', type=float, default=0.5,
+                        help="Fraction of max_tokens the fake LLM returns")
+    parser.add_argument('--max-llm-calls', type=int, help="Per-job LLM call budget")
+    parser.add_argument('--max-llm-tokens', type=int, help="Per-job LLM token budget")
+    parser.add_argument('--max-seconds', type=float, help="Per-job wall-clock budget")
+    parser.add_argument('--out', help="Write the JSON report here instead of stdout")
+    parser.add_argument('--compare', help="Baseline report to compare the new results against")
+    parser.add_argument('--single', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--repo', help=argparse.SUPPRESS)
+    parser.add_argument('--fake-config', help=argparse.SUPPRESS)
+    parser.add_argument('--budget-config', default='{}', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.single:
+        print(json.dumps(_run_single(args)))
+        return
+
+    fake_config = {
+        'latency_ms': args.latency_ms,
+        'latency_jitter_ms': args.latency_jitter_ms,
+        'error_rate': args.error_rate,
+        'output_ratio': args.output_ratio,
+        'seed': args.seed
+    }
+
+    budget_config = {
+        key: value for key, value in {
+            'max_llm_calls': args.max_llm_calls,
+            'max_tokens': args.max_llm_tokens,
+            'max_seconds': args.max_seconds
+        }.items() if value is not None
+    }
+
+    runs = []
+    for size in args.sizes:
+        result = run_size(size, args.seed, fake_config, budget_config)
+        sys.stderr.write(
+            f"{size:>6} modules: {result['total_seconds']:.3f}s total, "
+            f"{result['llm']['requests']} LLM requests, {result['peak_rss_mb']} MB peak RSS\n"
+        )
+        runs.append(result)
+
+    report = {
+        'benchmark': 'pipeline',
+        'environment': environment_info(),
+        'config': {'seed': args.seed, 'fake_llm': fake_config, 'budget': budget_config},
+        'runs': runs
+    }
+    write_report(report, args.out)
+
+    if args.compare:
+        baseline = load_report(args.compare)
+        if baseline.get('config') != report['config']:
+            sys.stderr.write("WARNING: baseline was recorded with a different configuration\n")
+        print_comparison(compare_metrics(flatten(baseline), flatten(report)), out=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""
+Cold-start benchmark.
+
+Measures, in a fresh interpreter each time, how long `import main` takes,
+how long the app takes to start, and how long until the first cache-hit
+request to /generate-docs is answered. It also records which heavy
+dependencies (git, markdown, jinja2, openai and the generation services)
+had been imported by then; a cache hit should not need any of them.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_startup --repeat 5 --out startup.json
+    python -m benchmarks.bench_startup --compare startup.json
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import asyncio
+import argparse
+import tempfile
+import statistics
+import subprocess
+from typing import Dict, Any, List
+
+from .reporting import environment_info, write_report, load_report, compare_metrics, print_comparison
+
+HEAVY_MODULES = [
+    'git', 'markdown', 'jinja2', 'openai',
+    'services.repo_processor', 'services.doc_generator'
+]
+CACHED_REPO_URL = 'https://github.com/example/cached-repo'
+
+
+def _loaded_heavy_modules() -> List[str]:
+    return [name for name in HEAVY_MODULES if name in sys.modules]
+
+
+async def _first_cache_hit(app) -> Dict[str, Any]:
+    from .load_test import ASGIClient
+
+    timings = {}
+    start = time.perf_counter()
+    async with app.router.lifespan_context(app):
+        timings['startup_seconds'] = time.perf_counter() - start
+        request_start = time.perf_counter()
+        status, _, _ = await ASGIClient(app).post_json('/generate-docs', {'repo_url': CACHED_REPO_URL})
+        timings['first_hit_seconds'] = time.perf_counter() - request_start
+        timings['status'] = status
+        timings['loaded_after_hit'] = _loaded_heavy_modules()
+    return timings
+
+
+def _run_single() -> Dict[str, Any]:
+    """Child-process entry point: import the app and serve one cache hit"""
+    import logging
+    logging.disable(logging.CRITICAL)
+
+    start = time.perf_counter()
+    import main
+    import_seconds = time.perf_counter() - start
+    loaded_after_import = _loaded_heavy_modules()
+
+    result = asyncio.run(_first_cache_hit(main.app))
+    result.update({
+        'import_seconds': import_seconds,
+        'time_to_first_hit_seconds': time.perf_counter() - start,
+        'loaded_after_import': loaded_after_import
+    })
+    return result
+
+
+def _seed_cache(db_path: str):
+    """Create a cache database holding one result for CACHED_REPO_URL"""
+    from services.cache_manager import CacheManager
+
+    async def seed():
+        cache_manager = CacheManager(db_path=db_path)
+        await cache_manager.initialize()
+        await cache_manager.cache_result(cache_manager.get_cache_key(CACHED_REPO_URL), {
+            'doc_url': '/docs/cached-repo_docs.html',
+            'documentation': {'metadata': {'repo_url': CACHED_REPO_URL}}
+        })
+    asyncio.run(seed())
+
+
+def run_once(workdir: str) -> Dict[str, Any]:
+    """Benchmark one cold start in a fresh interpreter"""
+    backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(
+        os.environ,
+        CACHE_DB_PATH=os.path.join(workdir, 'cache.db'),
+        OUTPUT_DIR=os.path.join(workdir, 'output'),
+        LLM_BACKEND='fake',
+        REFRESH_AHEAD_ENABLED='false',
+        PRELOAD_GENERATION_STACK='false'
+    )
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, '-m', 'benchmarks.bench_startup', '--single'],
+        capture_output=True, text=True, cwd=backend_dir, env=env
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"Startup benchmark failed:\n{proc.stderr}")
+    result = json.loads(proc.stdout)
+    result['process_seconds'] = time.perf_counter() - start
+    return result
+
+
+def summarize(runs: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Median of each timing across runs"""
+    keys = ['import_seconds', 'startup_seconds', 'first_hit_seconds', 'time_to_first_hit_seconds', 'process_seconds']
+    summary = {key: round(statistics.median(run[key] for run in runs), 6) for key in keys}
+    summary['loaded_after_import'] = runs[-1]['loaded_after_import']
+    summary['loaded_after_hit'] = runs[-1]['loaded_after_hit']
+    summary['statuses'] = sorted({run['status'] for run in runs})
+    return summary
+
+
+def flatten(report: Dict[str, Any]) -> Dict[str, float]:
+    """Numeric metrics of a report for comparison"""
+    return {key: value for key, value in report['summary'].items() if isinstance(value, (int, float))}
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description="Cold-start and first cache-hit benchmark")
+    parser.add_argument('--repeat', type=int, default=5, help="Number of cold starts to measure")
+    parser.add_argument('--out', help="Write the JSON report here instead of stdout")
+    parser.add_argument('--compare', help="Baseline report to compare the new results against")
+    parser.add_argument('--single', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.single:
+        print(json.dumps(_run_single()))
+        return
+
+    workdir = tempfile.mkdtemp(prefix='bench_startup_')
+    try:
+        _seed_cache(os.path.join(workdir, 'cache.db'))
+        runs = [run_once(workdir) for _ in range(args.repeat)]
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    summary = summarize(runs)
+    sys.stderr.write(
+        f"import {summary['import_seconds'] * 1000:.1f} ms, first cache hit after "
+        f"{summary['time_to_first_hit_seconds'] * 1000:.1f} ms; "
+        f"loaded before the hit: {', '.join(summary['loaded_after_hit']) or 'none'}\n"
+    )
+    report = {
+        'benchmark': 'startup',
+        'environment': environment_info(),
+        'config': {'repeat': args.repeat},
+        'summary': summary,
+        'runs': runs
+    }
+    write_report(report, args.out)
+
+    if args.compare:
+        print_comparison(compare_metrics(flatten(load_report(args.compare)), flatten(report)), out=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
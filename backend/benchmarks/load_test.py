@@ -0,0 +1,402 @@
+"""
+HTTP load-test harness for the /generate-docs endpoint.
+
+By default the FastAPI app is driven in-process over ASGI with the
+deterministic FakeLLMBackend and local file:// fixture repositories, so
+results reflect our own serving path rather than GitHub or OpenAI. Pass
+--target to drive an already-running server over HTTP instead.
+
+Scenarios:
+    hits   - every request is a cache hit on a pre-warmed repository
+    cold   - every request is a cache miss on a distinct repository
+    burst  - bursts of concurrent requests for the same uncached repository
+    saturated - cache hits measured while cold misses saturate the pipeline
+    large_hits - cache hits on a pre-warmed repository of --large-modules modules
+
+Usage (from the backend directory):
+    python -m benchmarks.load_test --scenarios hits cold burst --out load.json
+    python -m benchmarks.load_test --baseline load.json --max-regression 0.25
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import asyncio
+import argparse
+import tempfile
+from typing import Dict, Any, List, Optional, Tuple
+
+from .synthetic_repo import generate_repo
+from .reporting import environment_info, write_report, load_report, compare_metrics, print_comparison
+
+DEFAULT_SCENARIOS = ['hits', 'cold', 'burst', 'saturated', 'large_hits']
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of `values` (0 when empty)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def create_fixture_repos(root: str, count: int, modules: int, prefix: str = 'fixture') -> List[str]:
+    """Create `count` small git repositories under `root` and return their file:// URLs"""
+    from git import Repo
+
+    urls = []
+    for index in range(count):
+        path = os.path.join(root, f"{prefix}{index}")
+        generate_repo(path, modules, seed=index)
+        repo = Repo.init(path)
+        with repo.config_writer() as config:
+            config.set_value('user', 'name', 'Load Test')
+            config.set_value('user', 'email', 'loadtest@example.com')
+        repo.git.add(A=True)
+        repo.git.commit(m="fixture")
+        urls.append(f"file://{path}")
+    return urls
+
+
+class ASGIClient:
+    """Minimal in-process HTTP client that calls an ASGI app directly"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def post_json(self, path: str, payload: Dict[str, Any]) -> Tuple[int, Dict[str, str], bytes]:
+        body = json.dumps(payload).encode()
+        scope = {
+            'type': 'http',
+            'asgi': {'version': '3.0'},
+            'http_version': '1.1',
+            'method': 'POST',
+            'scheme': 'http',
+            'path': path,
+            'raw_path': path.encode(),
+            'query_string': b'',
+            'root_path': '',
+            'headers': [
+                (b'host', b'loadtest'),
+                (b'content-type', b'application/json'),
+                (b'content-length', str(len(body)).encode())
+            ],
+            'client': ('127.0.0.1', 0),
+            'server': ('loadtest', 80)
+        }
+        request_sent = False
+        response_done = asyncio.Event()
+        status = 0
+        headers: Dict[str, str] = {}
+        chunks: List[bytes] = []
+
+        async def receive():
+            nonlocal request_sent
+            if not request_sent:
+                request_sent = True
+                return {'type': 'http.request', 'body': body, 'more_body': False}
+            await response_done.wait()
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+                headers.update({k.decode().lower(): v.decode() for k, v in message.get('headers', [])})
+            elif message['type'] == 'http.response.body':
+                chunks.append(message.get('body', b''))
+                if not message.get('more_body', False):
+                    response_done.set()
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            response_done.set()
+        return status, headers, b''.join(chunks)
+
+    async def close(self):
+        pass
+
+
+class HTTPClient:
+    """Client for an external server, built on httpx"""
+
+    def __init__(self, base_url: str):
+        import httpx
+        self.client = httpx.AsyncClient(base_url=base_url, timeout=None)
+
+    async def post_json(self, path: str, payload: Dict[str, Any]) -> Tuple[int, Dict[str, str], bytes]:
+        response = await self.client.post(path, json=payload)
+        return response.status_code, dict(response.headers), response.content
+
+    async def close(self):
+        await self.client.aclose()
+
+
+class LoopLagMonitor:
+    """Measure how late the event loop wakes a periodic sleeper"""
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.samples: List[float] = []
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self):
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(0.0, time.perf_counter() - start - self.interval))
+
+    def start(self):
+        self.samples = []
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+
+async def run_requests(client, urls: List[str], concurrency: int) -> Dict[str, Any]:
+    """Send one request per URL with at most `concurrency` in flight and summarise the results"""
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+    errors = 0
+    semaphore = asyncio.Semaphore(concurrency)
+    monitor = LoopLagMonitor()
+
+    async def one(url: str):
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                status, _, _ = await client.post_json('/generate-docs', {'repo_url': url})
+            except Exception:
+                status = 0
+            latencies.append(time.perf_counter() - start)
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+            if status != 200:
+                errors += 1
+
+    monitor.start()
+    start = time.perf_counter()
+    await asyncio.gather(*(one(url) for url in urls))
+    elapsed = time.perf_counter() - start
+    await monitor.stop()
+
+    return {
+        'requests': len(urls),
+        'errors': errors,
+        'error_rate': errors / len(urls) if urls else 0.0,
+        'status_counts': statuses,
+        'elapsed_seconds': round(elapsed, 6),
+        'throughput_rps': round(len(urls) / elapsed, 3) if elapsed else 0.0,
+        'latency_ms': {
+            'p50': round(percentile(latencies, 50) * 1000, 3),
+            'p95': round(percentile(latencies, 95) * 1000, 3),
+            'p99': round(percentile(latencies, 99) * 1000, 3),
+            'max': round(max(latencies, default=0.0) * 1000, 3)
+        },
+        'loop_lag_ms': {
+            'p50': round(percentile(monitor.samples, 50) * 1000, 3),
+            'p99': round(percentile(monitor.samples, 99) * 1000, 3),
+            'max': round(max(monitor.samples, default=0.0) * 1000, 3)
+        }
+    }
+
+
+async def run_scenario(name: str, client, fixtures: List[str], args) -> Dict[str, Any]:
+    """Prepare and run one named traffic scenario"""
+    if name == 'hits':
+        warm = fixtures[:1]
+        await run_requests(client, warm, 1)
+        urls = warm * args.requests
+    elif name == 'large_hits':
+        # A large cached result must not make hits slower than on a small one
+        warm = fixtures[-1:]
+        await run_requests(client, warm, 1)
+        urls = warm * args.requests
+    elif name == 'cold':
+        urls = fixtures[1:1 + args.requests]
+    elif name == 'burst':
+        urls = []
+        for url in fixtures[1 + args.requests:1 + args.requests + args.bursts]:
+            urls += [url] * args.burst_size
+    elif name == 'saturated':
+        warm = fixtures[:1]
+        await run_requests(client, warm, 1)
+        background_urls = fixtures[1 + args.requests + args.bursts:1 + 2 * args.requests + args.bursts]
+        background = asyncio.create_task(run_requests(client, background_urls, args.concurrency))
+        # Give the cold jobs a moment to occupy the pipeline before measuring hits
+        await asyncio.sleep(0.1)
+        result = await run_requests(client, warm * args.requests, args.concurrency)
+        result['background'] = await background
+        return result
+    else:
+        raise ValueError(f"Unknown scenario: {name}")
+
+    concurrency = args.burst_size if name == 'burst' else args.concurrency
+    return await run_requests(client, urls, concurrency)
+
+
+def _build_local_app(workdir: str, fake_config: Dict[str, Any], hedge_budget: float = 0.0):
+    """Import the FastAPI app and give it services backed by fake, throwaway backends"""
+    import main
+    from services.container import ServiceContainer, settings_from_config
+    from services.llm_client import FakeLLMBackend, HedgedBackend
+
+    backend = FakeLLMBackend.from_config(fake_config)
+    if hedge_budget > 0:
+        backend = HedgedBackend(backend, budget=hedge_budget)
+
+    settings = settings_from_config(
+        ALLOW_LOCAL_REPOS=True,
+        CACHE_DB_PATH=os.path.join(workdir, 'cache.db'),
+        OUTPUT_DIR=os.path.join(workdir, 'output'),
+        REFRESH_AHEAD_ENABLED=False,
+        PRELOAD_GENERATION_STACK=False
+    )
+    main.app.state.container = ServiceContainer(settings, llm_backend=backend)
+    return main
+
+
+async def run_load_test(args) -> Dict[str, Any]:
+    fake_config = {
+        'latency_ms': args.latency_ms,
+        'latency_jitter_ms': args.latency_jitter_ms,
+        'error_rate': args.error_rate,
+        'tail_rate': args.tail_rate,
+        'tail_latency_ms': args.tail_latency_ms,
+        'seed': args.seed
+    }
+    workdir = tempfile.mkdtemp(prefix='loadtest_')
+    try:
+        fixture_count = 1 + 2 * args.requests + args.bursts
+        fixtures = create_fixture_repos(os.path.join(workdir, 'repos'), fixture_count, args.modules)
+        if 'large_hits' in args.scenarios:
+            fixtures += create_fixture_repos(os.path.join(workdir, 'repos'), 1, args.large_modules, prefix='large')
+
+        if args.target:
+            client = HTTPClient(args.target)
+        else:
+            main = _build_local_app(workdir, fake_config, args.hedge_budget)
+            await main.app.state.container.startup()
+            client = ASGIClient(main.app)
+
+        results = {}
+        try:
+            for name in args.scenarios:
+                results[name] = await run_scenario(name, client, fixtures, args)
+                sys.stderr.write(
+                    f"{name:<10} {results[name]['throughput_rps']:>9.2f} req/s  "
+                    f"p50 {results[name]['latency_ms']['p50']:>9.2f} ms  "
+                    f"p99 {results[name]['latency_ms']['p99']:>9.2f} ms  "
+                    f"errors {results[name]['error_rate']:.1%}  "
+                    f"loop lag max {results[name]['loop_lag_ms']['max']:.2f} ms\n"
+                )
+        finally:
+            await client.close()
+            if not args.target:
+                await main.app.state.container.shutdown()
+
+        return {
+            'benchmark': 'load_test',
+            'environment': environment_info(),
+            'config': {
+                'target': args.target or 'in-process',
+                'requests': args.requests,
+                'concurrency': args.concurrency,
+                'bursts': args.bursts,
+                'burst_size': args.burst_size,
+                'modules': args.modules,
+                'large_modules': args.large_modules,
+                'fake_llm': fake_config,
+                'hedge_budget': args.hedge_budget
+            },
+            'scenarios': results
+        }
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def flatten(report: Dict[str, Any]) -> Dict[str, float]:
+    """Flatten gate-relevant metrics into `<scenario>.<metric>` pairs"""
+    flat = {}
+    for name, result in report['scenarios'].items():
+        flat[f"{name}.throughput_rps"] = result['throughput_rps']
+        flat[f"{name}.error_rate"] = result['error_rate']
+        flat[f"{name}.loop_lag_max_ms"] = result['loop_lag_ms']['max']
+        for pct, value in result['latency_ms'].items():
+            flat[f"{name}.latency_{pct}_ms"] = value
+    return flat
+
+
+def check_regressions(baseline: Dict[str, Any], current: Dict[str, Any], max_regression: float) -> List[str]:
+    """
+    Return a description of every gated metric that regressed beyond `max_regression`.
+
+    Throughput may not drop, and p95/p99 latency may not grow, by more than
+    the allowed fraction. Error rates may not grow by more than one percentage
+    point.
+    """
+    failures = []
+    for row in compare_metrics(flatten(baseline), flatten(current)):
+        metric = row['metric']
+        if metric.endswith('throughput_rps') and -row['change'] > max_regression:
+            failures.append(f"{metric} dropped {-row['change']:.1%}")
+        elif metric.endswith(('latency_p95_ms', 'latency_p99_ms')) and row['change'] > max_regression:
+            failures.append(f"{metric} grew {row['change']:.1%}")
+        elif metric.endswith('error_rate') and row['current'] - row['baseline'] > 0.01:
+            failures.append(f"{metric} rose from {row['baseline']:.1%} to {row['current']:.1%}")
+    return failures
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description="Load test the /generate-docs endpoint")
+    parser.add_argument('--scenarios', nargs='+', default=DEFAULT_SCENARIOS, choices=DEFAULT_SCENARIOS)
+    parser.add_argument('--requests', type=int, default=20, help="Requests per hits/cold scenario")
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--bursts', type=int, default=2, help="Number of duplicate-URL bursts")
+    parser.add_argument('--burst-size', type=int, default=10, help="Concurrent requests per burst")
+    parser.add_argument('--modules', type=int, default=5, help="Modules per fixture repository")
+    parser.add_argument('--large-modules', type=int, default=500,
+                        help="Modules in the large_hits fixture repository")
+    parser.add_argument('--latency-ms', type=float, default=20.0, help="Fake LLM mean latency")
+    parser.add_argument('--latency-jitter-ms', type=float, default=10.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--tail-rate', type=float, default=0.0,
+                        help="Fraction of fake LLM calls that take --tail-latency-ms")
+    parser.add_argument('--tail-latency-ms', type=float, default=0.0)
+    parser.add_argument('--hedge-budget', type=float, default=0.0,
+                        help="Hedge slow LLM calls, up to this fraction of requests")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--target', help="Base URL of a running server (default: in-process app)")
+    parser.add_argument('--out', help="Write the JSON report here instead of stdout")
+    parser.add_argument('--baseline', help="Previous report to gate against")
+    parser.add_argument('--max-regression', type=float, default=0.25,
+                        help="Allowed relative regression before the gate fails")
+    args = parser.parse_args(argv)
+
+    import logging
+    logging.disable(logging.CRITICAL)
+
+    report = asyncio.run(run_load_test(args))
+    write_report(report, args.out)
+
+    if args.baseline:
+        baseline = load_report(args.baseline)
+        print_comparison(compare_metrics(flatten(baseline), flatten(report)), out=sys.stderr)
+        failures = check_regressions(baseline, report, args.max_regression)
+        for failure in failures:
+            sys.stderr.write(f"REGRESSION: {failure}\n")
+        if failures:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
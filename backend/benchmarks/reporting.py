@@ -0,0 +1,37 @@
+import sys
+import json
+from typing import Dict, Any, List
+
+# Shared with the batch CLI, which should not depend on the benchmarks package
+from services.reporting import environment_info, write_report
+
+
+def load_report(path: str) -> Dict[str, Any]:
+    """Load a report previously written by write_report"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def compare_metrics(baseline: Dict[str, float], current: Dict[str, float]) -> List[Dict[str, Any]]:
+    """
+    Compare two flat metric dicts.
+
+    Returns:
+        One row per metric present in both, with the relative change
+        (positive means the current value is larger)
+    """
+    rows = []
+    for name in sorted(set(baseline) & set(current)):
+        before, after = baseline[name], current[name]
+        change = (after - before) / before if before else 0.0
+        rows.append({'metric': name, 'baseline': before, 'current': after, 'change': change})
+    return rows
+
+
+def print_comparison(rows: List[Dict[str, Any]], out=sys.stdout):
+    """Print rows produced by compare_metrics as a table"""
+    for row in rows:
+        out.write(
+            f"{row['metric']:<45} {row['baseline']:>14.4f} {row['current']:>14.4f} "
+            f"{row['change'] * 100:>+8.1f}%\n"
+        )
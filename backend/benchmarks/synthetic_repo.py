@@ -0,0 +1,90 @@
+import os
+import random
+from typing import Optional
+
+MODULES_PER_PACKAGE = 50
+
+
+def generate_repo(path: str, num_modules: int, seed: int = 0) -> str:
+    """
+    Write a deterministic synthetic Python repository to `path`.
+
+    Modules are spread over packages of MODULES_PER_PACKAGE files. Each
+    module defines a documented class, a couple of functions and a constant,
+    and imports a few earlier modules so the repo has a realistic
+    dependency structure.
+
+    Returns:
+        The path the repository was written to
+    """
+    rng = random.Random(seed)
+    module_names = []
+
+    for index in range(num_modules):
+        package = f"pkg{index // MODULES_PER_PACKAGE}"
+        package_dir = os.path.join(path, package)
+        if index % MODULES_PER_PACKAGE == 0:
+            os.makedirs(package_dir, exist_ok=True)
+            with open(os.path.join(package_dir, '__init__.py'), 'w', encoding='utf-8') as f:
+                f.write(f'"""Synthetic package {package}"""\n')
+
+        module = f"module{index}"
+        imports = rng.sample(module_names, min(len(module_names), rng.randint(0, 3)))
+        module_names.append(f"{package}.{module}")
+
+        with open(os.path.join(package_dir, f"{module}.py"), 'w', encoding='utf-8') as f:
+            f.write(_render_module(index, imports, rng))
+
+    return path
+
+
+def _render_module(index: int, imports: list, rng: random.Random) -> str:
+    lines = [f'"""Synthetic module number {index}."""', '', 'from typing import Optional']
+    for name in imports:
+        lines.append(f"import {name}")
+    lines += [
+        '',
+        f"MAX_ITEMS_{index} = {rng.randint(1, 1000)}",
+        '',
+        '',
+        f"class Widget{index}:",
+        f'    """Container for widget {index} state."""',
+        '',
+        '    def __init__(self, size: int = 1):',
+        '        self.size = size',
+        '',
+        '    def get_size(self) -> int:',
+        '        """Return the widget size."""',
+        '        return self.size',
+        '',
+        '    def resize(self, factor: float) -> None:',
+        '        """Scale the widget by `factor`."""',
+        '        self.size = int(self.size * factor)',
+        '',
+        '',
+        f"def build_widget_{index}(size: int, name: Optional[str] = None) -> Widget{index}:",
+        f'    """Create a new Widget{index}."""',
+        f"    return Widget{index}(size)",
+        '',
+        '',
+        f"def transform_{index}(values: list) -> list:",
+    ]
+    for step in range(rng.randint(1, 4)):
+        lines.append(f"    values = [v * {step + 1} for v in values]")
+    lines += ['    return values', '']
+    return '\n'.join(lines)
+
+
+def main(argv: Optional[list] = None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Generate a synthetic Python repository")
+    parser.add_argument('path')
+    parser.add_argument('--modules', type=int, default=100)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+    generate_repo(args.path, args.modules, args.seed)
+
+
+if __name__ == "__main__":
+    main()
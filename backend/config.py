@@ -1,20 +1,71 @@
 import os
+import sys
 from typing import Optional
+from dotenv import load_dotenv
+
+# Settings may come from a .env file in the working directory
+load_dotenv()
 
 # Environment Configuration
 OPENAI_API_KEY: Optional[str] = os.getenv('OPENAI_API_KEY')
 HOST: str = os.getenv('HOST', '0.0.0.0')
 PORT: int = int(os.getenv('PORT', '8000'))
 DEBUG: bool = os.getenv('DEBUG', 'False').lower() == 'true'
+ALLOW_LOCAL_REPOS: bool = os.getenv('ALLOW_LOCAL_REPOS', 'False').lower() == 'true'
 
 # Cache Configuration
 CACHE_DB_PATH: str = os.getenv('CACHE_DB_PATH', 'cache.db')
 CACHE_DURATION_DAYS: int = int(os.getenv('CACHE_DURATION_DAYS', '7'))
 
+# Admission Control
+MAX_CONCURRENT_JOBS: int = int(os.getenv('MAX_CONCURRENT_JOBS', '4'))
+MAX_QUEUED_JOBS: int = int(os.getenv('MAX_QUEUED_JOBS', '16'))
+MAX_INFLIGHT_LLM_TOKENS: int = int(os.getenv('MAX_INFLIGHT_LLM_TOKENS', '60000'))
+JOB_QUEUE_TIMEOUT_SECONDS: float = float(os.getenv('JOB_QUEUE_TIMEOUT_SECONDS', '30'))
+
+# Deadlines and hedging
+JOB_DEADLINE_SECONDS: float = float(os.getenv('JOB_DEADLINE_SECONDS', '900'))
+LLM_CALL_TIMEOUT_SECONDS: float = float(os.getenv('LLM_CALL_TIMEOUT_SECONDS', '120'))
+LLM_HEDGE_BUDGET: float = float(os.getenv('LLM_HEDGE_BUDGET', '0'))
+
+# Per-job LLM budget (0 means unlimited)
+JOB_MAX_LLM_CALLS: int = int(os.getenv('JOB_MAX_LLM_CALLS', '300'))
+JOB_MAX_LLM_TOKENS: int = int(os.getenv('JOB_MAX_LLM_TOKENS', '600000'))
+JOB_BUDGET_SECONDS: float = float(os.getenv('JOB_BUDGET_SECONDS', '600'))
+
+# LLM Configuration
+LLM_BACKEND: str = os.getenv('LLM_BACKEND', 'openai')  # 'openai' or 'fake'
+LLM_LARGE_MODEL: str = os.getenv('LLM_LARGE_MODEL', 'gpt-4')
+LLM_SMALL_MODEL: str = os.getenv('LLM_SMALL_MODEL', 'gpt-3.5-turbo')
+# Prompt plus answer must fit the smallest context window of the models above
+LLM_CONTEXT_TOKENS: int = int(os.getenv('LLM_CONTEXT_TOKENS', '4096'))
+LLM_MAX_PROMPT_TOKENS: int = int(os.getenv('LLM_MAX_PROMPT_TOKENS', '3000'))
+
+# Lazy symbol documentation
+LAZY_SYMBOL_DOCS: bool = os.getenv('LAZY_SYMBOL_DOCS', 'False').lower() == 'true'
+SYMBOL_PREFETCH_COUNT: int = int(os.getenv('SYMBOL_PREFETCH_COUNT', '2'))
+
+# Refresh-ahead and stale-while-revalidate
+REFRESH_AHEAD_ENABLED: bool = os.getenv('REFRESH_AHEAD_ENABLED', 'True').lower() == 'true'
+REFRESH_INTERVAL_SECONDS: float = float(os.getenv('REFRESH_INTERVAL_SECONDS', '300'))
+REFRESH_WINDOW_HOURS: float = float(os.getenv('REFRESH_WINDOW_HOURS', '24'))
+REFRESH_MIN_HITS: float = float(os.getenv('REFRESH_MIN_HITS', '3'))
+REFRESH_MAX_PER_CYCLE: int = int(os.getenv('REFRESH_MAX_PER_CYCLE', '2'))
+REFRESH_OFF_PEAK_HOURS: str = os.getenv('REFRESH_OFF_PEAK_HOURS', '')
+CACHE_STALE_SECONDS: float = float(os.getenv('CACHE_STALE_SECONDS', '0'))
+
+# Search Configuration
+SEARCH_INDEX_CACHE_SIZE: int = int(os.getenv('SEARCH_INDEX_CACHE_SIZE', '32'))
+
+# Startup: import the generation stack in the background after startup
+# instead of on the first cache miss
+PRELOAD_GENERATION_STACK: bool = os.getenv('PRELOAD_GENERATION_STACK', 'True').lower() == 'true'
+
 # Output Configuration
 OUTPUT_DIR: str = os.getenv('OUTPUT_DIR', 'sample_output')
 
 # Validation
-if not OPENAI_API_KEY:
-    print("WARNING: OPENAI_API_KEY environment variable is not set!")
-    print("Please set your OpenAI API key in the environment or .env file") 
\ No newline at end of file
+if not OPENAI_API_KEY and LLM_BACKEND == 'openai':
+    # stderr, so tools that write JSON to stdout (batch.py --report -) stay parseable
+    print("WARNING: OPENAI_API_KEY environment variable is not set!", file=sys.stderr)
+    print("Please set your OpenAI API key in the environment or .env file", file=sys.stderr) 
\ No newline at end of file
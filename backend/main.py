@@ -1,25 +1,39 @@
-from fastapi import FastAPI, HTTPException, BackgroundTasks
+from fastapi import FastAPI, HTTPException, BackgroundTasks, Request, Depends
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel
-import os
-from dotenv import load_dotenv
+import asyncio
 import logging
-from typing import Optional
+from contextlib import asynccontextmanager
+from typing import Optional, Dict, Any
 
-from services.repo_processor import RepoProcessor
-from services.doc_generator import DocGenerator
-from services.cache_manager import CacheManager
-
-# Load environment variables
-load_dotenv()
+# Loads .env and reads every setting from the environment
+import config
+from services.container import ServiceContainer
+from services.admission import OverloadedError
+from services.cancellation import JobCancelledError, DeadlineExceededError
+from services.jobs import Job
+from services.search_index import SearchIndex
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="ConductDoc API", version="1.0.0")
+MAX_SEARCH_RESULTS = 100
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Create services from config on startup and stop background work on shutdown"""
+    # A container set beforehand (e.g. by the load-test harness) is used as is
+    if getattr(app.state, "container", None) is None:
+        app.state.container = ServiceContainer()
+    await app.state.container.startup()
+    logger.info("ConductDoc API started successfully")
+    yield
+    await app.state.container.shutdown()
+
+app = FastAPI(title="ConductDoc API", version="1.0.0", lifespan=lifespan)
 
 # CORS configuration
 app.add_middleware(
@@ -30,9 +44,25 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Mount static files for serving generated documentation
-os.makedirs("sample_output", exist_ok=True)
-app.mount("/docs", StaticFiles(directory="sample_output"), name="docs")
+def get_container(request: Request) -> ServiceContainer:
+    """Services for the running app"""
+    return request.app.state.container
+
+class OutputFiles:
+    """Serves generated documentation from the running container's OUTPUT_DIR"""
+    
+    def __init__(self):
+        self._files: Dict[str, StaticFiles] = {}
+    
+    async def __call__(self, scope, receive, send):
+        directory = scope["app"].state.container.settings.OUTPUT_DIR
+        files = self._files.get(directory)
+        if files is None:
+            files = self._files[directory] = StaticFiles(directory=directory)
+        await files(scope, receive, send)
+
+# Mount static files for serving generated docs
+app.mount("/docs", OutputFiles(), name="docs")
 
 class RepoRequest(BaseModel):
     repo_url: str
@@ -40,80 +70,182 @@ class RepoRequest(BaseModel):
 class DocResponse(BaseModel):
     status: str
     doc_url: Optional[str] = None
+    search_url: Optional[str] = None
     message: str
     task_id: Optional[str] = None
 
-# Global services
-repo_processor = RepoProcessor()
-doc_generator = DocGenerator()
-cache_manager = CacheManager()
-
-@app.on_event("startup")
-async def startup_event():
-    """Initialize services on startup"""
-    await cache_manager.initialize()
-    logger.info("ConductDoc API started successfully")
-
 @app.get("/")
 async def root():
     """Health check endpoint"""
     return {"message": "ConductDoc API is running"}
 
 @app.post("/generate-docs", response_model=DocResponse)
-async def generate_docs(request: RepoRequest):
+async def generate_docs(
+    request: RepoRequest,
+    http_request: Request,
+    container: ServiceContainer = Depends(get_container)
+):
     """Generate documentation for a GitHub repository"""
     try:
         # Validate repository URL
-        if not request.repo_url.startswith(("https://github.com/", "http://github.com/")):
+        allowed_prefixes = ("https://github.com/", "http://github.com/")
+        if container.settings.ALLOW_LOCAL_REPOS:
+            allowed_prefixes += ("file://",)
+        if not request.repo_url.startswith(allowed_prefixes):
             raise HTTPException(status_code=400, detail="Invalid GitHub repository URL")
         
         logger.info(f"Processing repository: {request.repo_url}")
         
         # Check if documentation already exists in cache
-        cache_key = cache_manager.get_cache_key(request.repo_url)
-        cached_result = await cache_manager.get_cached_result(cache_key)
+        cache_key = container.cache_manager.get_cache_key(request.repo_url)
+        cache_entry = await container.cache_manager.get_cache_entry(cache_key)
         
-        if cached_result:
+        if cache_entry:
+            message = "Documentation retrieved from cache"
+            if cache_entry["stale"]:
+                # Serve the expired copy now and regenerate it in the background
+                container.refresh_scheduler.revalidate(request.repo_url, cache_key)
+                container.metrics.increment('cache.stale_hits')
+                message += " (refreshing in background)"
+            else:
+                container.metrics.increment('cache.hits')
             logger.info(f"Returning cached result for {request.repo_url}")
             return DocResponse(
                 status="success",
-                doc_url=cached_result["doc_url"],
-                message="Documentation retrieved from cache"
+                doc_url=cache_entry["doc_url"],
+                search_url=cache_entry["search_url"],
+                message=message
             )
+        container.metrics.increment('cache.misses')
         
-        # Process repository
-        repo_data = await repo_processor.process_repository(request.repo_url)
-        
-        # Generate documentation
-        doc_result = await doc_generator.generate_documentation(repo_data)
-        
-        # Cache the result
-        await cache_manager.cache_result(cache_key, doc_result)
+        # Join an in-flight job for the same repository, or start a new one
+        job = container.join_generation_job(request.repo_url, cache_key)
+        try:
+            doc_result = await _wait_for_job(job, http_request)
+        finally:
+            container.jobs.leave(job)
         
         logger.info(f"Successfully generated documentation for {request.repo_url}")
         
         return DocResponse(
             status="success",
             doc_url=doc_result["doc_url"],
+            search_url=doc_result.get("search_url"),
             message="Documentation generated successfully"
         )
         
+    except HTTPException:
+        raise
+    except OverloadedError as e:
+        raise HTTPException(
+            status_code=503,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)}
+        )
+    except DeadlineExceededError as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    except JobCancelledError as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except Exception as e:
         logger.error(f"Error generating documentation: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+async def _wait_for_job(job: Job, http_request: Request) -> Dict[str, Any]:
+    """Wait for a job's result, giving up as soon as the client disconnects"""
+    result = asyncio.ensure_future(asyncio.shield(job.task))
+    disconnected = asyncio.ensure_future(_wait_for_disconnect(http_request))
+    try:
+        await asyncio.wait({result, disconnected}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        disconnected.cancel()
+        result.cancel()
+    
+    if job.task.cancelled():
+        raise JobCancelledError("Job was cancelled")
+    if not job.task.done():
+        logger.info(f"Client disconnected while waiting for {job.repo_url}")
+        raise HTTPException(status_code=499, detail="Client disconnected")
+    return job.task.result()
+
+async def _wait_for_disconnect(http_request: Request):
+    """Return once the client has closed the connection"""
+    while True:
+        message = await http_request.receive()
+        if message["type"] == "http.disconnect":
+            return
+
+@app.get("/search")
+async def search(
+    repo_url: str,
+    q: str,
+    limit: int = 20,
+    container: ServiceContainer = Depends(get_container)
+):
+    """Search module and symbol docs of an already documented repository"""
+    cache_key = container.cache_manager.get_cache_key(repo_url)
+    index = container.search_indexes.get(cache_key)
+    if index is None:
+        index_data = await container.cache_manager.get_search_index(cache_key)
+        if index_data is None:
+            raise HTTPException(status_code=404, detail="No documentation found for this repository")
+        index = SearchIndex(index_data)
+        container.search_indexes.put(cache_key, index)
+    
+    with container.metrics.timer('search.lookup'):
+        results = index.search(q, limit=max(1, min(limit, MAX_SEARCH_RESULTS)))
+    container.metrics.increment('search.requests')
+    
+    return {"query": q, "doc_url": index.doc_url, "results": results}
+
+@app.get("/symbol-docs")
+async def symbol_docs(
+    repo_url: str,
+    module: str,
+    position: int,
+    symbol: Optional[str] = None,
+    container: ServiceContainer = Depends(get_container)
+):
+    """Documentation for a symbol deferred in lazy mode, generated and cached on first request"""
+    cache_key = container.cache_manager.get_cache_key(repo_url)
+    doc = await container.lazy_docs.get(cache_key, module, position, symbol)
+    if doc is None:
+        raise HTTPException(status_code=404, detail="Symbol not found or not documented lazily")
+    return doc
+
+@app.get("/jobs")
+async def list_jobs(container: ServiceContainer = Depends(get_container)):
+    """List generation jobs that are currently running"""
+    return {"jobs": container.jobs.list()}
+
+@app.post("/jobs/{job_id}/cancel")
+async def cancel_job(job_id: str, container: ServiceContainer = Depends(get_container)):
+    """Cancel a running generation job"""
+    if not container.jobs.cancel(job_id):
+        raise HTTPException(status_code=404, detail="Job not found")
+    return {"status": "cancelled", "job_id": job_id}
+
+@app.get("/metrics")
+async def metrics(container: ServiceContainer = Depends(get_container)):
+    """Pipeline counters, stage timings and LLM usage"""
+    snapshot = container.metrics.snapshot()
+    snapshot["llm"] = container.llm_stats()
+    return snapshot
+
 @app.get("/health")
-async def health_check():
+async def health_check(container: ServiceContainer = Depends(get_container)):
     """Detailed health check"""
+    # The generation services are created on the first cache miss
+    generation = "active" if container.generation_stack_loaded else "not loaded"
     return {
         "status": "healthy",
         "services": {
-            "repo_processor": "active",
-            "doc_generator": "active",
+            "repo_processor": generation,
+            "doc_generator": generation,
             "cache_manager": "active"
-        }
+        },
+        "admission": container.admission.stats()
     }
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000) 
\ No newline at end of file
+    uvicorn.run(app, host=config.HOST, port=config.PORT) 
\ No newline at end of file
@@ -0,0 +1,180 @@
+import asyncio
+import time
+import logging
+import multiprocessing
+from contextlib import asynccontextmanager
+from typing import Dict, Any
+
+logger = logging.getLogger(__name__)
+
+
+class OverloadedError(Exception):
+    """Raised when a job is rejected because the service is at capacity"""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class TokenLimiter:
+    """Caps the number of LLM tokens (prompt + max output) in flight at once"""
+
+    def __init__(self, max_tokens: int):
+        self.max_tokens = max_tokens
+        self.in_flight = 0
+        self._condition = None
+
+    @asynccontextmanager
+    async def reserve(self, tokens: int):
+        """Wait until `tokens` fit under the limit and hold them for the duration of the block"""
+        # A single request larger than the limit is allowed to run on its own
+        tokens = min(tokens, self.max_tokens)
+        # Created lazily so the condition binds to the running event loop
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.in_flight + tokens <= self.max_tokens)
+            self.in_flight += tokens
+        try:
+            yield
+        finally:
+            async with self._condition:
+                self.in_flight -= tokens
+                self._condition.notify_all()
+
+
+class AdmissionController:
+    """
+    Admission control for documentation generation jobs.
+
+    At most `max_concurrent_jobs` jobs run at once and at most
+    `max_queued_jobs` wait for a slot; anything beyond that is rejected
+    immediately with an OverloadedError carrying a Retry-After estimate.
+    Queued jobs that wait longer than `queue_timeout` are rejected as well.
+    """
+
+    def __init__(
+        self,
+        max_concurrent_jobs: int = 4,
+        max_queued_jobs: int = 16,
+        max_inflight_tokens: int = 60000,
+        queue_timeout: float = 30.0
+    ):
+        self.max_concurrent_jobs = max_concurrent_jobs
+        self.max_queued_jobs = max_queued_jobs
+        self.queue_timeout = queue_timeout
+        self.llm_tokens = TokenLimiter(max_inflight_tokens)
+        self.active_jobs = 0
+        self.queued_jobs = 0
+        self.rejected_jobs = 0
+        self._slots = None
+        self._avg_job_seconds = 60.0
+
+    def retry_after(self) -> int:
+        """Estimate how many seconds until a job slot frees up"""
+        waiting = self.queued_jobs + 1
+        return max(1, int(self._avg_job_seconds * waiting / self.max_concurrent_jobs))
+
+    def _reject(self, reason: str):
+        self.rejected_jobs += 1
+        retry_after = self.retry_after()
+        logger.warning(f"Rejecting job: {reason} (retry after {retry_after}s)")
+        raise OverloadedError(f"Service overloaded: {reason}", retry_after)
+
+    @asynccontextmanager
+    async def job(self):
+        """Hold a job slot for the duration of the block, or raise OverloadedError"""
+        if self.active_jobs + self.queued_jobs >= self.max_concurrent_jobs + self.max_queued_jobs:
+            self._reject("job queue is full")
+
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_concurrent_jobs)
+
+        self.queued_jobs += 1
+        try:
+            await asyncio.wait_for(self._slots.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            self._reject("timed out waiting for a job slot")
+        finally:
+            self.queued_jobs -= 1
+
+        self.active_jobs += 1
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.active_jobs -= 1
+            self._slots.release()
+            # Exponential moving average feeds the Retry-After estimate
+            self._avg_job_seconds = 0.8 * self._avg_job_seconds + 0.2 * (time.monotonic() - start)
+
+    def stats(self) -> Dict[str, Any]:
+        """Current admission state"""
+        return {
+            'active_jobs': self.active_jobs,
+            'queued_jobs': self.queued_jobs,
+            'rejected_jobs': self.rejected_jobs,
+            'max_concurrent_jobs': self.max_concurrent_jobs,
+            'max_queued_jobs': self.max_queued_jobs,
+            'llm_tokens_in_flight': self.llm_tokens.in_flight,
+            'max_inflight_llm_tokens': self.llm_tokens.max_tokens
+        }
+
+
+class SharedRateLimiter:
+    """
+    Token-bucket limit on LLM calls and tokens per minute, shared across processes.
+
+    The bucket lives in shared memory, so worker processes started with the
+    same multiprocessing context draw from one budget. Exposes the same
+    `reserve(tokens)` interface as TokenLimiter, so it can be passed to
+    DocGenerator as its token limiter. A limit of 0 disables it.
+    """
+
+    def __init__(self, calls_per_minute: float = 0, tokens_per_minute: float = 0, context=None):
+        context = context or multiprocessing.get_context()
+        self.calls_per_minute = calls_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self._lock = context.Lock()
+        self._calls = context.Value('d', float(calls_per_minute), lock=False)
+        self._tokens = context.Value('d', float(tokens_per_minute), lock=False)
+        self._updated = context.Value('d', time.time(), lock=False)
+
+    def _try_acquire(self, tokens: int) -> float:
+        """Take one call and `tokens` from the bucket, or return how long to wait first"""
+        with self._lock:
+            now = time.time()
+            elapsed = now - self._updated.value
+            self._updated.value = now
+            self._calls.value = min(self.calls_per_minute, self._calls.value + elapsed * self.calls_per_minute / 60)
+            self._tokens.value = min(self.tokens_per_minute, self._tokens.value + elapsed * self.tokens_per_minute / 60)
+
+            waits = [0.0]
+            if self.calls_per_minute and self._calls.value < 1:
+                waits.append((1 - self._calls.value) * 60 / self.calls_per_minute)
+            if self.tokens_per_minute:
+                # A request larger than the whole bucket waits for a full bucket
+                needed = min(tokens, self.tokens_per_minute)
+                if self._tokens.value < needed:
+                    waits.append((needed - self._tokens.value) * 60 / self.tokens_per_minute)
+            wait = max(waits)
+            if wait == 0:
+                if self.calls_per_minute:
+                    self._calls.value -= 1
+                if self.tokens_per_minute:
+                    self._tokens.value -= min(tokens, self.tokens_per_minute)
+            return wait
+
+    async def acquire(self, tokens: int):
+        """Wait until a call with `tokens` fits the per-minute limits"""
+        while True:
+            wait = self._try_acquire(tokens)
+            if wait == 0:
+                return
+            await asyncio.sleep(wait)
+
+    @asynccontextmanager
+    async def reserve(self, tokens: int):
+        """Acquire before the block; rate budget is spent, not returned, afterwards"""
+        await self.acquire(tokens)
+        yield
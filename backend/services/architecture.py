@@ -0,0 +1,112 @@
+from collections import defaultdict
+from typing import Dict, List, Any, Tuple
+
+ROOT_LABEL = '(root)'
+
+
+def _collapse(package: str, depth: int) -> str:
+    if not package:
+        return ROOT_LABEL
+    return '.'.join(package.split('.')[:depth])
+
+
+def _describe(node: Dict[str, int], per_module: bool) -> str:
+    # A single module's box only needs its symbol count
+    if per_module and node['modules'] == 1:
+        return f"{node['symbols']} symbols"
+    return f"{node['modules']} modules, {node['symbols']} symbols"
+
+
+def collapse_index(index: Dict[str, Any], max_nodes: int) -> Tuple[Dict[str, Dict[str, int]], Dict[Tuple[str, str], int]]:
+    """
+    Merge packages into their ancestors until at most `max_nodes` remain.
+
+    If that would leave a single package, the deeper level is kept and its
+    smallest packages are folded into one "other" node instead. Module-level
+    indexes (see build_dependency_index) are collapsed the same way.
+    Each round is linear in the number of packages and edges, and there is
+    at most one round per level of package nesting.
+    """
+    packages = index['packages']
+    kind = 'modules' if index.get('level') == 'module' else 'packages'
+    depth = max((len(name.split('.')) for name in packages if name), default=1)
+
+    def group(depth: int) -> Dict[str, Dict[str, int]]:
+        nodes: Dict[str, Dict[str, int]] = defaultdict(lambda: {'modules': 0, 'symbols': 0})
+        for name, stats in packages.items():
+            node = nodes[_collapse(name, depth)]
+            node['modules'] += stats['modules']
+            node['symbols'] += stats['symbols']
+        return nodes
+
+    nodes = group(depth)
+    while len(nodes) > max_nodes and depth > 1:
+        shallower = group(depth - 1)
+        # A single box says nothing; rather keep this level and fold the tail below
+        if len(shallower) <= 2:
+            break
+        depth, nodes = depth - 1, shallower
+
+    # Even top-level packages can be too many; fold the smallest into one node
+    rename = {name: name for name in nodes}
+    if len(nodes) > max_nodes:
+        ordered = sorted(nodes, key=lambda n: (-nodes[n]['modules'], -nodes[n]['symbols'], n))
+        other = f"({len(ordered) - max_nodes + 1} other {kind})"
+        merged = {'modules': 0, 'symbols': 0}
+        for name in ordered[max_nodes - 1:]:
+            rename[name] = other
+            merged['modules'] += nodes[name]['modules']
+            merged['symbols'] += nodes[name]['symbols']
+        nodes = {name: nodes[name] for name in ordered[:max_nodes - 1]}
+        nodes[other] = merged
+
+    edges: Dict[Tuple[str, str], int] = defaultdict(int)
+    for source, destination, count in index['edges']:
+        source = rename.get(_collapse(source, depth))
+        destination = rename.get(_collapse(destination, depth))
+        if source and destination and source != destination:
+            edges[(source, destination)] += count
+
+    return dict(nodes), dict(edges)
+
+
+def render_architecture_diagram(
+    index: Dict[str, Any],
+    repo_name: str,
+    max_nodes: int = 25,
+    max_edges: int = 60
+) -> str:
+    """
+    Render a package-level Mermaid diagram from a dependency index.
+
+    Packages are clustered by top-level package, collapsed to at most
+    `max_nodes` boxes, and only the `max_edges` heaviest import edges are drawn.
+    Module-level indexes get one box per module, within the same limits.
+    """
+    nodes, edges = collapse_index(index, max_nodes)
+    per_module = index.get('level') == 'module'
+    clean_repo_name = ''.join(c for c in repo_name if c.isalnum() or c in [' ', '-', '_'])
+
+    ids = {name: f"P{i}" for i, name in enumerate(sorted(nodes))}
+    clusters: Dict[str, List[str]] = defaultdict(list)
+    for name in sorted(nodes):
+        clusters[name.split('.')[0]].append(name)
+
+    lines = ["```mermaid", "graph LR"]
+    for cluster, members in sorted(clusters.items()):
+        boxes = [f'{ids[name]}["{name}<br/>{_describe(nodes[name], per_module)}"]' for name in members]
+        if len(members) > 1:
+            lines.append(f'    subgraph C_{ids[members[0]]}["{cluster}"]')
+            lines += [f"        {box}" for box in boxes]
+            lines.append("    end")
+        else:
+            lines += [f"    {box}" for box in boxes]
+
+    heaviest = sorted(edges.items(), key=lambda item: (-item[1], item[0]))[:max_edges]
+    for (source, destination), count in heaviest:
+        lines.append(f"    {ids[source]} -->|{count}| {ids[destination]}")
+
+    if not nodes:
+        lines.append(f"    A[{clean_repo_name}]")
+    lines.append("```")
+    return '\n'.join(lines)
@@ -0,0 +1,66 @@
+import time
+import contextvars
+from typing import Dict, Any, Optional
+
+
+class BudgetExhaustedError(Exception):
+    """Raised when a job has no LLM budget left"""
+
+
+class JobBudget:
+    """
+    Per-job limits on LLM calls, tokens and wall-clock time.
+
+    Work is spent in importance order; once any limit is reached the
+    remaining symbols fall back to template documentation, so a job always
+    returns a complete result at bounded cost.
+    """
+
+    def __init__(
+        self,
+        max_llm_calls: Optional[int] = None,
+        max_tokens: Optional[int] = None,
+        max_seconds: Optional[float] = None
+    ):
+        self.max_llm_calls = max_llm_calls
+        self.max_tokens = max_tokens
+        self.max_seconds = max_seconds
+        self.llm_calls = 0
+        self.tokens = 0
+        self.denied_calls = 0
+        self.started_at = time.monotonic()
+
+    @property
+    def exhausted(self) -> bool:
+        if self.max_llm_calls is not None and self.llm_calls >= self.max_llm_calls:
+            return True
+        if self.max_tokens is not None and self.tokens >= self.max_tokens:
+            return True
+        if self.max_seconds is not None and time.monotonic() - self.started_at >= self.max_seconds:
+            return True
+        return False
+
+    def spend(self, tokens: int):
+        """Charge one LLM call of `tokens` tokens, or raise BudgetExhaustedError"""
+        if self.exhausted or (self.max_tokens is not None and self.tokens + tokens > self.max_tokens):
+            self.denied_calls += 1
+            raise BudgetExhaustedError("Job LLM budget exhausted")
+        self.llm_calls += 1
+        self.tokens += tokens
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'llm_calls': self.llm_calls,
+            'tokens': self.tokens,
+            'elapsed_seconds': round(time.monotonic() - self.started_at, 3),
+            'denied_calls': self.denied_calls,
+            'max_llm_calls': self.max_llm_calls,
+            'max_tokens': self.max_tokens,
+            'max_seconds': self.max_seconds
+        }
+
+
+# Budget for the job running in the current task; None means unlimited
+current_budget: contextvars.ContextVar[Optional[JobBudget]] = contextvars.ContextVar(
+    'current_budget', default=None
+)
@@ -1,9 +1,10 @@
 import os
+import asyncio
 import sqlite3
 import json
 import hashlib
 import logging
-from typing import Dict, Any, Optional
+from typing import Dict, List, Any, Optional, Tuple
 from datetime import datetime, timedelta
 
 logger = logging.getLogger(__name__)
@@ -11,9 +12,17 @@ logger = logging.getLogger(__name__)
 class CacheManager:
     """Service for caching LLM responses and documentation results"""
     
-    def __init__(self, db_path: str = "cache.db"):
+    def __init__(self, db_path: str = "cache.db", stale_seconds: float = 0.0, cache_duration_days: int = 7):
         self.db_path = db_path
-        self.cache_duration_days = 7  # Cache expires after 7 days
+        self.cache_duration_days = cache_duration_days  # Cache expires after 7 days by default
+        # Expired entries are still served (and refreshed in the background) for this long
+        self.stale_seconds = stale_seconds
+        # Reads since the last flush_hits, as cache key -> (count, last accessed)
+        self._pending_hits: Dict[str, Tuple[int, str]] = {}
+    
+    def _stale_cutoff(self) -> str:
+        """Entries expiring before this timestamp are gone, not just stale"""
+        return (datetime.now() - timedelta(seconds=self.stale_seconds)).isoformat()
     
     async def initialize(self):
         """Initialize the cache database"""
@@ -21,15 +30,28 @@ class CacheManager:
             with sqlite3.connect(self.db_path) as conn:
                 cursor = conn.cursor()
                 
+                # The URLs returned on a hit precede result_data: SQLite reads a row's
+                # columns in order, so hits never walk the docs' overflow pages.
+                # Tables created before these columns existed are rebuilt
+                columns = [row[1] for row in cursor.execute('PRAGMA table_info(cache)')]
+                rebuild = bool(columns) and 'doc_url' not in columns
+                if rebuild:
+                    cursor.execute('ALTER TABLE cache RENAME TO cache_without_urls')
+                    cursor.execute('DROP INDEX IF EXISTS idx_cache_key')
+                
                 # Create cache table
                 cursor.execute('''
                     CREATE TABLE IF NOT EXISTS cache (
                         id INTEGER PRIMARY KEY AUTOINCREMENT,
                         cache_key TEXT UNIQUE NOT NULL,
                         repo_url TEXT NOT NULL,
-                        result_data TEXT NOT NULL,
+                        doc_url TEXT,
+                        search_url TEXT,
                         created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        expires_at TIMESTAMP NOT NULL
+                        expires_at TIMESTAMP NOT NULL,
+                        hit_count REAL NOT NULL DEFAULT 0,
+                        last_accessed TIMESTAMP,
+                        result_data TEXT NOT NULL
                     )
                 ''')
                 
@@ -38,6 +60,61 @@ class CacheManager:
                     CREATE INDEX IF NOT EXISTS idx_cache_key ON cache (cache_key)
                 ''')
                 
+                if rebuild:
+                    # Access tracking arrived with refresh-ahead; older tables lack it
+                    hit_count = 'hit_count' if 'hit_count' in columns else '0'
+                    last_accessed = 'last_accessed' if 'last_accessed' in columns else 'NULL'
+                    cursor.execute(f'''
+                        INSERT INTO cache (cache_key, repo_url, doc_url, search_url, created_at,
+                                           expires_at, hit_count, last_accessed, result_data)
+                        SELECT cache_key, repo_url,
+                               json_extract(result_data, '$.doc_url'), json_extract(result_data, '$.search_url'),
+                               created_at, expires_at, {hit_count}, {last_accessed}, result_data
+                        FROM cache_without_urls
+                    ''')
+                    cursor.execute('DROP TABLE cache_without_urls')
+                
+                # Search indexes are stored apart from results so /search never loads the docs
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS search_index (
+                        cache_key TEXT PRIMARY KEY,
+                        repo_url TEXT NOT NULL,
+                        index_data TEXT NOT NULL,
+                        expires_at TIMESTAMP NOT NULL
+                    )
+                ''')
+                
+                # Symbols documented lazily: documentation stays NULL until first requested.
+                # Rows are keyed by position, as symbols in one module can share a name;
+                # tables keyed by name are rebuilt
+                keyed_by_name = 'symbol_name' in {
+                    row[1] for row in cursor.execute('PRAGMA table_info(symbol_docs)') if row[5]
+                }
+                if keyed_by_name:
+                    cursor.execute('ALTER TABLE symbol_docs RENAME TO symbol_docs_by_name')
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS symbol_docs (
+                        cache_key TEXT NOT NULL,
+                        repo_url TEXT NOT NULL,
+                        module_name TEXT NOT NULL,
+                        symbol_name TEXT NOT NULL,
+                        position INTEGER NOT NULL,
+                        symbol_data TEXT NOT NULL,
+                        route TEXT NOT NULL,
+                        documentation TEXT,
+                        expires_at TIMESTAMP NOT NULL,
+                        PRIMARY KEY (cache_key, module_name, position)
+                    )
+                ''')
+                if keyed_by_name:
+                    cursor.execute('''
+                        INSERT OR IGNORE INTO symbol_docs
+                        SELECT cache_key, repo_url, module_name, symbol_name, position,
+                               symbol_data, route, documentation, expires_at
+                        FROM symbol_docs_by_name
+                    ''')
+                    cursor.execute('DROP TABLE symbol_docs_by_name')
+                
                 conn.commit()
                 logger.info("Cache database initialized successfully")
                 
@@ -52,29 +129,117 @@ class CacheManager:
     
     async def get_cached_result(self, cache_key: str) -> Optional[Dict[str, Any]]:
         """Retrieve cached result if it exists and is not expired"""
+        try:
+            return await asyncio.to_thread(self._read_result, cache_key)
+        except Exception as e:
+            logger.error(f"Error retrieving from cache: {str(e)}")
+            return None
+    
+    def _read_result(self, cache_key: str) -> Optional[Dict[str, Any]]:
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute('''
+                SELECT result_data
+                FROM cache
+                WHERE cache_key = ? AND expires_at > ?
+            ''', (cache_key, datetime.now().isoformat()))
+            
+            result = cursor.fetchone()
+            return json.loads(result[0]) if result else None
+    
+    async def get_cache_entry(self, cache_key: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up the URLs of a cached result and record the access.
+        
+        Returns {'doc_url', 'search_url', 'expires_at', 'stale'}; 'stale' is
+        True for an expired entry still within the stale-while-revalidate
+        window. Only the URL columns are read, never result_data, and the
+        query runs in a worker thread so hits do not block the event loop.
+        Accesses are counted in memory and written by flush_hits, so a hit
+        never writes to the database.
+        """
+        try:
+            result = await asyncio.to_thread(self._read_entry, cache_key)
+        except Exception as e:
+            logger.error(f"Error retrieving from cache: {str(e)}")
+            return None
+        
+        if not result:
+            logger.info(f"Cache miss for key: {cache_key}")
+            return None
+        
+        doc_url, search_url, expires_at = result
+        now = datetime.now().isoformat()
+        hits, _ = self._pending_hits.get(cache_key, (0, now))
+        self._pending_hits[cache_key] = (hits + 1, now)
+        stale = expires_at <= now
+        logger.info(f"Cache {'stale hit' if stale else 'hit'} for key: {cache_key}")
+        return {'doc_url': doc_url, 'search_url': search_url, 'expires_at': expires_at, 'stale': stale}
+    
+    def _read_entry(self, cache_key: str) -> Optional[Tuple[str, Optional[str], str]]:
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute('''
+                SELECT doc_url, search_url, expires_at
+                FROM cache
+                WHERE cache_key = ? AND expires_at > ?
+            ''', (cache_key, self._stale_cutoff()))
+            
+            return cursor.fetchone()
+    
+    async def flush_hits(self):
+        """Add the accesses counted since the last flush to the cache table"""
+        if not self._pending_hits:
+            return
+        pending, self._pending_hits = self._pending_hits, {}
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                
+                cursor.executemany('''
+                    UPDATE cache SET hit_count = hit_count + ?, last_accessed = ?
+                    WHERE cache_key = ?
+                ''', [(hits, last_accessed, cache_key) for cache_key, (hits, last_accessed) in pending.items()])
+                
+                conn.commit()
+                
+        except Exception as e:
+            logger.error(f"Error recording cache accesses: {str(e)}")
+            # Keep the counts for the next flush, merged with any counted meanwhile
+            for cache_key, (hits, last_accessed) in pending.items():
+                newer_hits, newer_accessed = self._pending_hits.get(cache_key, (0, last_accessed))
+                self._pending_hits[cache_key] = (hits + newer_hits, max(last_accessed, newer_accessed))
+    
+    async def get_refresh_candidates(
+        self,
+        expiring_before: datetime,
+        min_hits: float,
+        limit: int
+    ) -> List[Dict[str, Any]]:
+        """Popular entries that expire before `expiring_before`, most accessed first"""
+        await self.flush_hits()
         try:
             with sqlite3.connect(self.db_path) as conn:
                 cursor = conn.cursor()
                 
                 cursor.execute('''
-                    SELECT result_data, expires_at 
-                    FROM cache 
-                    WHERE cache_key = ? AND expires_at > ?
-                ''', (cache_key, datetime.now().isoformat()))
+                    SELECT cache_key, repo_url, hit_count, expires_at
+                    FROM cache
+                    WHERE expires_at < ? AND expires_at > ? AND hit_count >= ? AND repo_url != ''
+                    ORDER BY hit_count DESC, expires_at
+                    LIMIT ?
+                ''', (expiring_before.isoformat(), self._stale_cutoff(), min_hits, limit))
                 
-                result = cursor.fetchone()
+                return [
+                    {'cache_key': cache_key, 'repo_url': repo_url, 'hits': hits, 'expires_at': expires_at}
+                    for cache_key, repo_url, hits, expires_at in cursor.fetchall()
+                ]
                 
-                if result:
-                    result_data, expires_at = result
-                    logger.info(f"Cache hit for key: {cache_key}")
-                    return json.loads(result_data)
-                else:
-                    logger.info(f"Cache miss for key: {cache_key}")
-                    return None
-                    
         except Exception as e:
-            logger.error(f"Error retrieving from cache: {str(e)}")
-            return None
+            logger.error(f"Error listing refresh candidates: {str(e)}")
+            return []
     
     async def cache_result(self, cache_key: str, result_data: Dict[str, Any]):
         """Cache a documentation result"""
@@ -88,11 +253,47 @@ class CacheManager:
                 # Get repo URL from result data
                 repo_url = result_data.get('documentation', {}).get('metadata', {}).get('repo_url', '')
                 
-                # Insert or update cache entry
+                # The search index goes to its own table, with the same expiry
+                result_data = dict(result_data)
+                search_index = result_data.pop('search_index', None)
+                
+                # Insert or update cache entry; access counts are halved on refresh
+                # so popularity decays for repositories nobody reads any more
                 cursor.execute('''
-                    INSERT OR REPLACE INTO cache (cache_key, repo_url, result_data, expires_at)
-                    VALUES (?, ?, ?, ?)
-                ''', (cache_key, repo_url, json.dumps(result_data), expires_at.isoformat()))
+                    INSERT INTO cache (cache_key, repo_url, result_data, doc_url, search_url, expires_at)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                    ON CONFLICT (cache_key) DO UPDATE SET
+                        repo_url = excluded.repo_url,
+                        result_data = excluded.result_data,
+                        doc_url = excluded.doc_url,
+                        search_url = excluded.search_url,
+                        created_at = CURRENT_TIMESTAMP,
+                        expires_at = excluded.expires_at,
+                        hit_count = hit_count / 2
+                ''', (
+                    cache_key, repo_url, json.dumps(result_data),
+                    result_data.get('doc_url'), result_data.get('search_url'), expires_at.isoformat()
+                ))
+                
+                if search_index is not None:
+                    cursor.execute('''
+                        INSERT OR REPLACE INTO search_index (cache_key, repo_url, index_data, expires_at)
+                        VALUES (?, ?, ?, ?)
+                    ''', (cache_key, repo_url, json.dumps(search_index), expires_at.isoformat()))
+                
+                # A fresh result replaces any symbol docs generated for the previous one
+                cursor.execute('DELETE FROM symbol_docs WHERE cache_key = ?', (cache_key,))
+                cursor.executemany('''
+                    INSERT INTO symbol_docs
+                        (cache_key, repo_url, module_name, symbol_name, position, symbol_data, route, expires_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ''', [
+                    (cache_key, repo_url, module['module_name'], symbol['name'], position,
+                     json.dumps(symbol['metadata']), symbol['route'], expires_at.isoformat())
+                    for module in result_data.get('documentation', {}).get('modules', [])
+                    for position, symbol in enumerate(module['symbols'])
+                    if symbol.get('pending')
+                ])
                 
                 conn.commit()
                 logger.info(f"Result cached for key: {cache_key}")
@@ -101,6 +302,88 @@ class CacheManager:
             logger.error(f"Error caching result: {str(e)}")
             # Don't raise exception here to avoid breaking the main flow
     
+    async def get_search_index(self, cache_key: str) -> Optional[Dict[str, Any]]:
+        """Retrieve the search index cached with a result, if it is not expired"""
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute('''
+                    SELECT index_data
+                    FROM search_index
+                    WHERE cache_key = ? AND expires_at > ?
+                ''', (cache_key, self._stale_cutoff()))
+                
+                result = cursor.fetchone()
+                return json.loads(result[0]) if result else None
+                
+        except Exception as e:
+            logger.error(f"Error retrieving search index: {str(e)}")
+            return None
+    
+    async def get_symbol_doc(self, cache_key: str, module_name: str, position: int) -> Optional[Dict[str, Any]]:
+        """Retrieve a lazily documented symbol by its position in the module; 'documentation' is None until generated"""
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute('''
+                    SELECT position, symbol_data, route, documentation
+                    FROM symbol_docs
+                    WHERE cache_key = ? AND module_name = ? AND position = ? AND expires_at > ?
+                ''', (cache_key, module_name, position, self._stale_cutoff()))
+                
+                result = cursor.fetchone()
+                if not result:
+                    return None
+                position, symbol_data, route, documentation = result
+                return {
+                    'position': position,
+                    'symbol': json.loads(symbol_data),
+                    'route': route,
+                    'documentation': documentation
+                }
+                
+        except Exception as e:
+            logger.error(f"Error retrieving symbol documentation: {str(e)}")
+            return None
+    
+    async def get_pending_symbols(self, cache_key: str, module_name: str, start: int, count: int) -> List[int]:
+        """Positions of not-yet-documented symbols in [start, start + count) in a module"""
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute('''
+                    SELECT position
+                    FROM symbol_docs
+                    WHERE cache_key = ? AND module_name = ? AND position >= ? AND position < ?
+                        AND documentation IS NULL
+                    ORDER BY position
+                ''', (cache_key, module_name, start, start + count))
+                
+                return [row[0] for row in cursor.fetchall()]
+                
+        except Exception as e:
+            logger.error(f"Error listing pending symbols: {str(e)}")
+            return []
+    
+    async def cache_symbol_doc(self, cache_key: str, module_name: str, position: int, documentation: str):
+        """Store the generated documentation of a lazily documented symbol"""
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute('''
+                    UPDATE symbol_docs SET documentation = ?
+                    WHERE cache_key = ? AND module_name = ? AND position = ?
+                ''', (documentation, cache_key, module_name, position))
+                
+                conn.commit()
+                
+        except Exception as e:
+            logger.error(f"Error caching symbol documentation: {str(e)}")
+    
     async def clear_expired_cache(self):
         """Clean up expired cache entries"""
         try:
@@ -108,11 +391,15 @@ class CacheManager:
                 cursor = conn.cursor()
                 
                 # Delete expired entries
+                # Entries in the stale-while-revalidate window are kept
+                cutoff = self._stale_cutoff()
                 cursor.execute('''
                     DELETE FROM cache WHERE expires_at < ?
-                ''', (datetime.now().isoformat(),))
+                ''', (cutoff,))
                 
                 deleted_count = cursor.rowcount
+                cursor.execute('DELETE FROM search_index WHERE expires_at < ?', (cutoff,))
+                cursor.execute('DELETE FROM symbol_docs WHERE expires_at < ?', (cutoff,))
                 conn.commit()
                 
                 if deleted_count > 0:
@@ -167,10 +454,14 @@ class CacheManager:
                 if repo_url:
                     # Clear cache for specific repository
                     cursor.execute('DELETE FROM cache WHERE repo_url = ?', (repo_url,))
+                    cursor.execute('DELETE FROM search_index WHERE repo_url = ?', (repo_url,))
+                    cursor.execute('DELETE FROM symbol_docs WHERE repo_url = ?', (repo_url,))
                     logger.info(f"Cleared cache for repository: {repo_url}")
                 else:
                     # Clear all cache
                     cursor.execute('DELETE FROM cache')
+                    cursor.execute('DELETE FROM search_index')
+                    cursor.execute('DELETE FROM symbol_docs')
                     logger.info("Cleared all cache entries")
                 
                 conn.commit()
@@ -0,0 +1,56 @@
+import time
+import threading
+import contextvars
+from typing import Optional
+
+
+class JobCancelledError(Exception):
+    """Raised when a job is cancelled before it finishes"""
+
+
+class DeadlineExceededError(JobCancelledError):
+    """Raised when a job runs past its deadline"""
+
+
+class CancellationToken:
+    """
+    Thread-safe cancellation flag with an optional deadline.
+
+    The same token is checked from the event loop (between LLM calls) and
+    from worker threads (between files while cloning and parsing).
+    """
+
+    def __init__(self, timeout: Optional[float] = None):
+        self._event = threading.Event()
+        self.deadline = time.monotonic() + timeout if timeout else None
+
+    def cancel(self):
+        """Request cancellation"""
+        self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    @property
+    def expired(self) -> bool:
+        return self.deadline is not None and time.monotonic() >= self.deadline
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left before the deadline, or None when there is no deadline"""
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.monotonic())
+
+    def check(self):
+        """Raise if the job was cancelled or its deadline has passed"""
+        if self._event.is_set():
+            raise JobCancelledError("Job was cancelled")
+        if self.expired:
+            raise DeadlineExceededError("Job deadline exceeded")
+
+
+# Token for the job running in the current task; None outside a job
+current_token: contextvars.ContextVar[Optional[CancellationToken]] = contextvars.ContextVar(
+    'current_token', default=None
+)
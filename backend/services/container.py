@@ -0,0 +1,197 @@
+import os
+import asyncio
+import logging
+import importlib
+from types import SimpleNamespace
+from typing import Any, Dict, Optional
+
+from .admission import AdmissionController
+from .budget import JobBudget
+from .cache_manager import CacheManager
+from .cancellation import CancellationToken
+from .jobs import JobRegistry
+from .metrics import Metrics
+from .refresh import RefreshScheduler, parse_hours
+from .search_index import SearchIndex, SearchIndexCache
+
+logger = logging.getLogger(__name__)
+
+# Imported by `preload`; everything a cache miss needs that a cache hit does not
+GENERATION_MODULES = [
+    'git', 'markdown', 'jinja2',
+    'services.repo_processor', 'services.doc_generator', 'services.lazy_docs'
+]
+
+
+def settings_from_config(**overrides) -> SimpleNamespace:
+    """Settings from config.py, with keyword overrides (e.g. OUTPUT_DIR='/tmp/out')"""
+    import config
+
+    values = {name: getattr(config, name) for name in dir(config) if name.isupper()}
+    values.update(overrides)
+    return SimpleNamespace(**values)
+
+
+class ServiceContainer:
+    """
+    Application services, built from config.py settings.
+
+    The cache, admission control, job registry and search indexes are cheap
+    and created up front. The generation stack (RepoProcessor, DocGenerator
+    and the git, markdown, jinja2 and openai packages behind them) is created
+    on first use, so a cold process answers cache hits before it has loaded.
+    """
+
+    def __init__(self, settings: Optional[Any] = None, llm_backend=None):
+        self.settings = settings or settings_from_config()
+        self._llm_backend = llm_backend
+        self._repo_processor = None
+        self._doc_generator = None
+        self._lazy_docs = None
+        self._preload_task: Optional[asyncio.Task] = None
+
+        s = self.settings
+        self.metrics = Metrics()
+        self.admission = AdmissionController(
+            max_concurrent_jobs=s.MAX_CONCURRENT_JOBS,
+            max_queued_jobs=s.MAX_QUEUED_JOBS,
+            max_inflight_tokens=s.MAX_INFLIGHT_LLM_TOKENS,
+            queue_timeout=s.JOB_QUEUE_TIMEOUT_SECONDS
+        )
+        self.cache_manager = CacheManager(
+            db_path=s.CACHE_DB_PATH,
+            stale_seconds=s.CACHE_STALE_SECONDS,
+            cache_duration_days=s.CACHE_DURATION_DAYS
+        )
+        # Generation jobs in flight, keyed by cache key, so duplicate requests share one job
+        self.jobs = JobRegistry(job_timeout=s.JOB_DEADLINE_SECONDS)
+        # Search indexes of recently documented or searched repositories
+        self.search_indexes = SearchIndexCache(max_size=s.SEARCH_INDEX_CACHE_SIZE)
+        self.refresh_scheduler = RefreshScheduler(
+            self.cache_manager,
+            self.admission,
+            self.refresh_repository,
+            metrics=self.metrics,
+            interval=s.REFRESH_INTERVAL_SECONDS,
+            window=s.REFRESH_WINDOW_HOURS * 3600,
+            min_hits=s.REFRESH_MIN_HITS,
+            max_per_cycle=s.REFRESH_MAX_PER_CYCLE,
+            off_peak=parse_hours(s.REFRESH_OFF_PEAK_HOURS)
+        )
+
+    async def startup(self):
+        """Prepare storage and start background work"""
+        os.makedirs(self.settings.OUTPUT_DIR, exist_ok=True)
+        await self.cache_manager.initialize()
+        if self.settings.REFRESH_AHEAD_ENABLED:
+            self.refresh_scheduler.start()
+        if self.settings.PRELOAD_GENERATION_STACK:
+            self._preload_task = asyncio.create_task(asyncio.to_thread(self.preload))
+
+    async def shutdown(self):
+        """Stop background work"""
+        await self.refresh_scheduler.stop()
+        await self.cache_manager.flush_hits()
+        if self._preload_task:
+            await asyncio.gather(self._preload_task, return_exceptions=True)
+
+    def preload(self):
+        """Import the generation stack ahead of the first cache miss"""
+        modules = list(GENERATION_MODULES)
+        if self._llm_backend is None and self.settings.LLM_BACKEND == 'openai':
+            modules.append('openai')
+        for name in modules:
+            try:
+                importlib.import_module(name)
+            except ImportError as e:
+                logger.warning(f"Could not preload {name}: {str(e)}")
+
+    @property
+    def generation_stack_loaded(self) -> bool:
+        return self._doc_generator is not None
+
+    @property
+    def repo_processor(self):
+        if self._repo_processor is None:
+            from .repo_processor import RepoProcessor
+            self._repo_processor = RepoProcessor(metrics=self.metrics)
+        return self._repo_processor
+
+    @property
+    def doc_generator(self):
+        if self._doc_generator is None:
+            from .doc_generator import DocGenerator
+            from .llm_client import create_backend
+            from .prompts import PromptBuilder
+            from .routing import SymbolRouter
+
+            s = self.settings
+            self._doc_generator = DocGenerator(
+                llm_backend=self._llm_backend or create_backend(s.LLM_BACKEND, hedge_budget=s.LLM_HEDGE_BUDGET),
+                output_dir=s.OUTPUT_DIR,
+                metrics=self.metrics,
+                token_limiter=self.admission.llm_tokens,
+                call_timeout=s.LLM_CALL_TIMEOUT_SECONDS,
+                router=SymbolRouter(large_model=s.LLM_LARGE_MODEL, small_model=s.LLM_SMALL_MODEL),
+                lazy_symbols=s.LAZY_SYMBOL_DOCS,
+                prompts=PromptBuilder(
+                    context_tokens=s.LLM_CONTEXT_TOKENS,
+                    max_prompt_tokens=s.LLM_MAX_PROMPT_TOKENS,
+                    metrics=self.metrics
+                )
+            )
+        return self._doc_generator
+
+    @property
+    def lazy_docs(self):
+        if self._lazy_docs is None:
+            from .lazy_docs import LazySymbolDocs
+            self._lazy_docs = LazySymbolDocs(
+                self.doc_generator, self.cache_manager, prefetch=self.settings.SYMBOL_PREFETCH_COUNT
+            )
+        return self._lazy_docs
+
+    def llm_stats(self) -> Optional[Dict[str, Any]]:
+        """LLM usage so far, or None while the generation stack is not loaded"""
+        if self._doc_generator is None:
+            return None
+        return dict(self._doc_generator.llm.stats)
+
+    async def run_generation_job(self, repo_url: str, cache_key: str, token: CancellationToken) -> Dict[str, Any]:
+        """Clone, document and cache a repository inside an admission-controlled job slot"""
+        s = self.settings
+        async with self.admission.job():
+            # Process repository
+            repo_data = await self.repo_processor.process_repository(repo_url, cancel_token=token)
+
+            # Generate documentation within this job's LLM budget
+            budget = JobBudget(
+                max_llm_calls=s.JOB_MAX_LLM_CALLS or None,
+                max_tokens=s.JOB_MAX_LLM_TOKENS or None,
+                max_seconds=s.JOB_BUDGET_SECONDS or None
+            )
+            doc_result = await self.doc_generator.generate_documentation(
+                repo_data, cancel_token=token, budget=budget
+            )
+
+            # Cache the result
+            await self.cache_manager.cache_result(cache_key, doc_result)
+            self.search_indexes.put(cache_key, SearchIndex(doc_result['search_index']))
+
+            return doc_result
+
+    def join_generation_job(self, repo_url: str, cache_key: str):
+        """Join the in-flight job for a repository, or start one"""
+        return self.jobs.join(
+            cache_key,
+            repo_url,
+            lambda token: self.run_generation_job(repo_url, cache_key, token)
+        )
+
+    async def refresh_repository(self, repo_url: str, cache_key: str):
+        """Regenerate a cached repository, sharing the job with any request for it"""
+        job = self.join_generation_job(repo_url, cache_key)
+        try:
+            await asyncio.shield(job.task)
+        finally:
+            self.jobs.leave(job)
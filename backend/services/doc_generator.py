@@ -1,46 +1,103 @@
 import os
 import json
+import asyncio
 import logging
-from typing import Dict, List, Any
-from openai import OpenAI
-import markdown
-from jinja2 import Template
+from typing import Dict, List, Any, Optional
 from datetime import datetime
 
+from .llm_client import LLMBackend, HedgedBackend, create_backend, estimate_tokens
+from .metrics import Metrics
+from .admission import TokenLimiter
+from .routing import SymbolRouter, TEMPLATE
+from .budget import JobBudget, BudgetExhaustedError, current_budget
+from .cancellation import CancellationToken, JobCancelledError, DeadlineExceededError, current_token
+from .import_graph import build_import_graph, build_dependency_index
+from .architecture import render_architecture_diagram
+from .search_index import build_search_index
+from .prompts import PromptBuilder
+
 logger = logging.getLogger(__name__)
 
 class DocGenerator:
     """Service for generating documentation using GPT-4"""
     
-    def __init__(self):
-        self.client = OpenAI(api_key="sk-proj-uaJQV2o....")
-        self.output_dir = "sample_output"
+    def __init__(
+        self,
+        llm_backend: Optional[LLMBackend] = None,
+        output_dir: str = "sample_output",
+        metrics: Optional[Metrics] = None,
+        token_limiter: Optional[TokenLimiter] = None,
+        call_timeout: Optional[float] = 120.0,
+        router: Optional[SymbolRouter] = None,
+        lazy_symbols: bool = False,
+        prompts: Optional[PromptBuilder] = None
+    ):
+        self.llm = llm_backend or create_backend()
+        self.router = router or SymbolRouter()
+        self.output_dir = output_dir
+        self.metrics = metrics or Metrics()
+        # Fits prompts to the model context and sizes max_tokens per call
+        self.prompts = prompts or PromptBuilder(metrics=self.metrics)
+        self.token_limiter = token_limiter
+        # Hedged duplicates of a call reserve from the same limiter as the call itself
+        if isinstance(self.llm, HedgedBackend) and self.llm.limiter is None:
+            self.llm.limiter = token_limiter
+        self.call_timeout = call_timeout
+        # Defer LLM-written symbol docs until a reader asks for them (see document_symbol)
+        self.lazy_symbols = lazy_symbols
         os.makedirs(self.output_dir, exist_ok=True)
     
-    async def generate_documentation(self, repo_data: Dict[str, Any]) -> Dict[str, Any]:
+    async def generate_documentation(
+        self,
+        repo_data: Dict[str, Any],
+        cancel_token: Optional[CancellationToken] = None,
+        budget: Optional[JobBudget] = None
+    ) -> Dict[str, Any]:
         """
         Generate comprehensive documentation for a repository
         
         Args:
             repo_data: Repository data with extracted symbols
+            cancel_token: Token checked before every LLM call; its deadline
+                also bounds each call's timeout
+            budget: Limits on LLM calls, tokens and time for this job. Modules
+                are documented in the order given, so once the budget runs
+                out the least important ones fall back to template docs
             
         Returns:
             Dictionary containing documentation URLs and metadata
         """
+        token_context = current_token.set(cancel_token)
+        budget_context = current_budget.set(budget)
+        try:
+            return await self._generate_documentation(repo_data, budget)
+        finally:
+            current_budget.reset(budget_context)
+            current_token.reset(token_context)
+    
+    async def _generate_documentation(
+        self,
+        repo_data: Dict[str, Any],
+        budget: Optional[JobBudget]
+    ) -> Dict[str, Any]:
+        """Run the overview, module, architecture and HTML stages"""
         try:
             logger.info(f"Generating documentation for {repo_data['repo_name']}")
             
             # Generate overview documentation
-            overview_doc = await self._generate_overview(repo_data)
+            with self.metrics.timer('docs.overview'):
+                overview_doc = await self._generate_overview(repo_data)
             
             # Generate module documentation
             module_docs = []
-            for module in repo_data['modules']:
-                module_doc = await self._generate_module_documentation(module)
-                module_docs.append(module_doc)
+            with self.metrics.timer('docs.modules'):
+                for module in repo_data['modules']:
+                    module_doc = await self._generate_module_documentation(module)
+                    module_docs.append(module_doc)
             
             # Generate architecture diagram
-            architecture_diagram = await self._generate_architecture_diagram(repo_data)
+            with self.metrics.timer('docs.architecture'):
+                architecture_diagram = await self._generate_architecture_diagram(repo_data)
             
             # Create final documentation
             final_docs = {
@@ -52,58 +109,102 @@ class DocGenerator:
                     'repo_url': repo_data['repo_url'],
                     'generated_at': datetime.now().isoformat(),
                     'total_modules': len(repo_data['modules']),
-                    'total_files': repo_data['total_files']
+                    'total_files': repo_data['total_files'],
+                    'skipped_modules': len(repo_data.get('skipped_modules', [])),
+                    'budget': budget.to_dict() if budget else None,
+                    'dependency_index': repo_data.get('dependency_index')
                 }
             }
             
+            # Index the markdown before it is rendered to HTML, off the event loop like rendering
+            with self.metrics.timer('docs.search_index'):
+                search_index = await asyncio.to_thread(build_search_index, final_docs, self.router)
+            
             # Generate HTML documentation
-            html_file = await self._create_html_documentation(final_docs)
+            with self.metrics.timer('docs.html'):
+                html_file = await self._create_html_documentation(final_docs)
+            
+            # Publish the index as a static shard next to the HTML for client-side search
+            search_index['doc_url'] = f'/docs/{html_file}'
+            search_file = await asyncio.to_thread(
+                self._write_search_index, search_index, repo_data['repo_name']
+            )
             
             return {
                 'doc_url': f'/docs/{html_file}',
+                'search_url': f'/docs/{search_file}',
                 'documentation': final_docs,
-                'file_path': html_file
+                'file_path': html_file,
+                'search_index': search_index
             }
             
+        except JobCancelledError:
+            raise
         except Exception as e:
             logger.error(f"Error generating documentation: {str(e)}")
             raise Exception(f"Documentation generation failed: {str(e)}")
     
+    async def _complete(
+        self,
+        prompt: str,
+        max_tokens: int,
+        temperature: float = 0.3,
+        model: Optional[str] = None
+    ) -> str:
+        """Send a prompt to the configured LLM backend (the large model unless `model` is given)"""
+        model = model or self.router.large_model
+        
+        budget = current_budget.get()
+        if budget is not None:
+            try:
+                budget.spend(estimate_tokens(prompt) + max_tokens)
+            except BudgetExhaustedError:
+                self.metrics.increment('budget.exhausted')
+                raise
+        
+        if self.token_limiter is None:
+            return await self._send(prompt, model, max_tokens, temperature)
+        
+        # Hold the prompt and worst-case output tokens against the shared in-flight budget
+        async with self.token_limiter.reserve(estimate_tokens(prompt) + max_tokens):
+            return await self._send(prompt, model, max_tokens, temperature)
+    
+    async def _send(self, prompt: str, model: str, max_tokens: int, temperature: float) -> str:
+        token = current_token.get()
+        timeout = self.call_timeout
+        if token is not None:
+            token.check()
+            remaining = token.remaining()
+            if remaining is not None:
+                timeout = remaining if timeout is None else min(timeout, remaining)
+        
+        self.metrics.increment('llm.requests')
+        self.metrics.increment(f'llm.requests.{model}')
+        self.metrics.increment('llm.max_tokens', max_tokens)
+        with self.metrics.timer('llm.wait'):
+            try:
+                return await asyncio.wait_for(
+                    self.llm.complete(prompt, model, max_tokens, temperature),
+                    timeout=timeout
+                )
+            except asyncio.TimeoutError:
+                self.metrics.increment('llm.timeouts')
+                if token is not None and token.expired:
+                    raise DeadlineExceededError("Job deadline exceeded")
+                raise
+    
     async def _generate_overview(self, repo_data: Dict[str, Any]) -> str:
         """Generate high-level overview of the repository"""
         try:
-            # Create summary of all modules
-            module_summary = []
-            for module in repo_data['modules']:
-                symbols = [s['name'] for s in module['symbols']]
-                module_summary.append(f"- {module['module_name']}: {', '.join(symbols[:5])}")
-            
-            prompt = f"""
-            Generate a comprehensive overview documentation for the Python repository '{repo_data['repo_name']}'.
-            
-            Repository contains {len(repo_data['modules'])} modules with the following structure:
-            {chr(10).join(module_summary)}
+            prompt, max_tokens = self.prompts.overview(repo_data)
+            content = await self._complete(prompt, max_tokens=max_tokens)
             
-            Please provide:
-            1. A clear, engaging summary of what this repository does
-            2. Main purpose and use cases
-            3. Key components and their roles
-            4. Getting started guide
-            5. Installation instructions (if applicable)
-            
-            Write in a professional, user-friendly tone that would help both developers and non-technical users understand the project.
-            Use markdown formatting for better readability.
-            """
-            
-            response = self.client.chat.completions.create(
-                model="gpt-4",
-                messages=[{"role": "user", "content": prompt}],
-                max_tokens=1500,
-                temperature=0.3
-            )
-            
-            return response.choices[0].message.content
+            return content
             
+        except JobCancelledError:
+            raise
+        except BudgetExhaustedError:
+            return self.router.render_overview_template(repo_data)
         except Exception as e:
             logger.error(f"Error generating overview: {str(e)}")
             return f"# {repo_data['repo_name']}\n\nError generating overview: {str(e)}"
@@ -111,41 +212,17 @@ class DocGenerator:
     async def _generate_module_documentation(self, module: Dict[str, Any]) -> Dict[str, Any]:
         """Generate documentation for a specific module"""
         try:
-            symbols_summary = []
-            for symbol in module['symbols']:
-                symbols_summary.append(f"- {symbol['type']}: {symbol['name']}")
-            
-            prompt = f"""
-            Generate detailed documentation for the Python module '{module['module_name']}' located at '{module['file_path']}'.
-            
-            Module docstring: {module['docstring'] or 'No docstring available'}
-            
-            The module contains the following symbols:
-            {chr(10).join(symbols_summary)}
+            prompt, max_tokens = self.prompts.module(module)
             
-            For each symbol, please provide:
-            1. A clear explanation of what it does
-            2. Parameters and return values (for functions/methods)
-            3. Usage examples where appropriate
-            4. Important notes or considerations
-            
-            Write in markdown format with proper headers and code blocks.
-            Make it comprehensive but easy to understand.
-            """
-            
-            response = self.client.chat.completions.create(
-                model="gpt-4",
-                messages=[{"role": "user", "content": prompt}],
-                max_tokens=2000,
-                temperature=0.3
-            )
-            
-            documentation = response.choices[0].message.content
+            try:
+                documentation = await self._complete(prompt, max_tokens=max_tokens)
+            except BudgetExhaustedError:
+                documentation = self.router.render_module_template(module)
             
             # Generate individual symbol documentation
             symbol_docs = []
             for symbol in module['symbols']:
-                symbol_doc = await self._generate_symbol_documentation(symbol)
+                symbol_doc = await self._generate_symbol_documentation(symbol, defer=self.lazy_symbols)
                 symbol_docs.append(symbol_doc)
             
             return {
@@ -155,6 +232,8 @@ class DocGenerator:
                 'symbols': symbol_docs
             }
             
+        except JobCancelledError:
+            raise
         except Exception as e:
             logger.error(f"Error generating module documentation: {str(e)}")
             return {
@@ -164,130 +243,90 @@ class DocGenerator:
                 'symbols': []
             }
     
-    async def _generate_symbol_documentation(self, symbol: Dict[str, Any]) -> Dict[str, Any]:
+    async def document_symbol(self, symbol: Dict[str, Any]) -> Dict[str, Any]:
+        """Generate the full documentation for a symbol that was deferred in lazy mode"""
+        with self.metrics.timer('docs.lazy_symbol'):
+            return await self._generate_symbol_documentation(symbol)
+    
+    async def _generate_symbol_documentation(self, symbol: Dict[str, Any], defer: bool = False) -> Dict[str, Any]:
         """Generate documentation for a specific symbol"""
+        route = self.router.route(symbol)
+        
+        # Trivial symbols are documented from their own metadata without an LLM call
+        if route == TEMPLATE:
+            self.metrics.increment(f'routing.{route}')
+            return {
+                'name': symbol['name'],
+                'type': symbol['type'],
+                'documentation': self.router.render_template(symbol),
+                'metadata': symbol,
+                'route': route
+            }
+        
+        # Lazy mode: show the template until someone asks for this symbol
+        if defer:
+            self.metrics.increment('lazy.deferred')
+            return {
+                'name': symbol['name'],
+                'type': symbol['type'],
+                'documentation': self.router.render_template(symbol),
+                'metadata': symbol,
+                'route': route,
+                'pending': True
+            }
+        
         try:
-            if symbol['type'] == 'class':
-                methods_info = []
-                for method in symbol.get('methods', []):
-                    methods_info.append(f"- {method['name']}: {method['docstring'] or 'No docstring'}")
-                
-                prompt = f"""
-                Generate detailed documentation for the Python class '{symbol['name']}'.
-                
-                Class docstring: {symbol['docstring'] or 'No docstring available'}
-                Base classes: {', '.join(symbol.get('base_classes', []))}
-                
-                Methods:
-                {chr(10).join(methods_info)}
-                
-                Please provide:
-                1. What this class represents and its purpose
-                2. Key functionality and use cases
-                3. Simple usage example
-                4. Important notes about initialization or usage
-                
-                Format as markdown with code examples.
-                """
-                
-            elif symbol['type'] in ['function', 'method']:
-                args_info = []
-                for arg in symbol.get('args', []):
-                    args_info.append(f"- {arg['name']}: {arg['annotation'] or 'Any'}")
-                
-                prompt = f"""
-                Generate detailed documentation for the Python {symbol['type']} '{symbol['name']}'.
-                
-                Docstring: {symbol['docstring'] or 'No docstring available'}
-                
-                Parameters:
-                {chr(10).join(args_info)}
-                
-                Returns: {symbol.get('returns', 'Not specified')}
-                
-                Please provide:
-                1. What this {symbol['type']} does
-                2. Parameter descriptions
-                3. Return value description
-                4. Usage example
-                5. Any important notes or exceptions
-                
-                Format as markdown with code examples.
-                """
-                
-            else:  # constant
-                prompt = f"""
-                Generate documentation for the Python constant '{symbol['name']}'.
-                
-                Value: {symbol.get('value', 'Not available')}
-                
-                Please provide:
-                1. What this constant represents
-                2. Its purpose and usage
-                3. Simple usage example
-                
-                Format as markdown.
-                """
-            
-            response = self.client.chat.completions.create(
-                model="gpt-4",
-                messages=[{"role": "user", "content": prompt}],
-                max_tokens=1000,
-                temperature=0.3
+            prompt, max_tokens = self.prompts.symbol(symbol)
+            content = await self._complete(
+                prompt, max_tokens=max_tokens, model=self.router.model_for(route)
             )
+            # LLM routes are counted once a call goes out, so budget fallbacks and deferred symbols are not
+            self.metrics.increment(f'routing.{route}')
             
             return {
                 'name': symbol['name'],
                 'type': symbol['type'],
-                'documentation': response.choices[0].message.content,
-                'metadata': symbol
+                'documentation': content,
+                'metadata': symbol,
+                'route': route
             }
             
+        except JobCancelledError:
+            raise
+        except BudgetExhaustedError:
+            # Out of budget: fall back to the same template docs trivial symbols get
+            self.metrics.increment('routing.budget_fallback')
+            return {
+                'name': symbol['name'],
+                'type': symbol['type'],
+                'documentation': self.router.render_template(symbol),
+                'metadata': symbol,
+                'route': TEMPLATE
+            }
         except Exception as e:
             logger.error(f"Error generating symbol documentation: {str(e)}")
+            self.metrics.increment(f'routing.{route}')
             return {
                 'name': symbol['name'],
                 'type': symbol['type'],
                 'documentation': f"Error generating documentation: {str(e)}",
-                'metadata': symbol
+                'metadata': symbol,
+                'route': route,
+                'error': True
             }
     
     async def _generate_architecture_diagram(self, repo_data: Dict[str, Any]) -> str:
-        """Generate a Mermaid architecture diagram"""
+        """Generate a package-level Mermaid architecture diagram from the import graph"""
         try:
-            # Create a simple, guaranteed-valid diagram based on repository structure
-            modules_count = len(repo_data['modules'])
-            total_symbols = sum(len(module['symbols']) for module in repo_data['modules'])
+            index = repo_data.get('dependency_index')
+            if index is None:
+                # Older repo data without an index: rebuild it from what was parsed
+                index = build_dependency_index(
+                    repo_data['modules'],
+                    repo_data.get('import_graph') or build_import_graph(repo_data['modules'])
+                )
             
-            # Get main modules (up to 3)
-            main_modules = []
-            for module in repo_data['modules'][:3]:
-                if module['symbols']:  # Only include modules with symbols
-                    module_name = module['module_name'].split('.')[-1]  # Get last part of module name
-                    # Clean module name for Mermaid (remove special chars)
-                    clean_name = ''.join(c for c in module_name if c.isalnum() or c in [' ', '-', '_'])
-                    if clean_name:
-                        main_modules.append(clean_name)
-            
-            # Create a clean repository name for Mermaid
-            clean_repo_name = ''.join(c for c in repo_data['repo_name'] if c.isalnum() or c in [' ', '-', '_'])
-            
-            # Generate a simple, valid diagram
-            diagram = f"""```mermaid
-graph TD
-    A[{clean_repo_name}] --> B[Core Modules]
-    A --> C[Python Files]
-    B --> D[Classes & Functions]
-    C --> E[{modules_count} Modules]
-    D --> F[{total_symbols} Symbols]"""
-            
-            # Add main modules if available
-            if main_modules:
-                for i, module in enumerate(main_modules):
-                    letter = chr(ord('G') + i)  # G, H, I, etc.
-                    diagram += f"\n    E --> {letter}[{module}]"
-            
-            diagram += "\n```"
+            diagram = render_architecture_diagram(index, repo_data['repo_name'])
             
             logger.info(f"Generated architecture diagram for {repo_data['repo_name']}")
             return diagram
@@ -304,8 +343,24 @@ graph TD
     D --> E
 ```"""
     
+    def _write_search_index(self, search_index: Dict[str, Any], repo_name: str) -> str:
+        """Write the search index as compact JSON to the output directory"""
+        filename = f"{repo_name}_search.json"
+        with open(os.path.join(self.output_dir, filename), 'w', encoding='utf-8') as f:
+            json.dump(search_index, f, separators=(',', ':'))
+        return filename
+    
     async def _create_html_documentation(self, docs: Dict[str, Any]) -> str:
         """Create HTML documentation file"""
+        # Markdown conversion and rendering are CPU-bound, so keep them off the event loop
+        return await asyncio.to_thread(self._render_html_documentation, docs)
+    
+    def _render_html_documentation(self, docs: Dict[str, Any]) -> str:
+        """Render the documentation to HTML and write it to the output directory"""
+        # Imported on first render so they stay out of process startup
+        import markdown
+        from jinja2 import Template
+        
         try:
             html_template = """
             <!DOCTYPE html>
@@ -333,6 +388,7 @@ graph TD
                     code { background: #f8f9fa; padding: 2px 4px; border-radius: 3px; font-family: 'Monaco', 'Menlo', monospace; }
                     .mermaid { text-align: center; margin: 20px 0; }
                     .metadata { color: #666; font-size: 0.9em; margin-top: 20px; }
+                    .load-symbol { background: #667eea; color: white; border: none; padding: 6px 12px; border-radius: 3px; cursor: pointer; }
                 </style>
                 <script src="https://cdn.jsdelivr.net/npm/mermaid/dist/mermaid.min.js"></script>
             </head>
@@ -385,7 +441,10 @@ graph TD
                                 {% for symbol in module.symbols %}
                                 <div class="symbol">
                                     <div class="symbol-header">{{ symbol.type | title }}: {{ symbol.name }}</div>
-                                    {{ symbol.documentation | safe }}
+                                    <div class="symbol-body">{{ symbol.documentation | safe }}</div>
+                                    {% if symbol.pending %}
+                                    <button class="load-symbol" data-module="{{ module.module_name }}" data-position="{{ loop.index0 }}" data-symbol="{{ symbol.name }}">Show detailed documentation</button>
+                                    {% endif %}
                                 </div>
                                 {% endfor %}
                                 {% endif %}
@@ -397,6 +456,33 @@ graph TD
                 
                 <script>
                     mermaid.initialize({startOnLoad:true});
+                    
+                    // Symbols documented lazily are generated (and cached) on first request
+                    document.querySelectorAll('.load-symbol').forEach(function (button) {
+                        button.addEventListener('click', function () {
+                            var params = new URLSearchParams({
+                                repo_url: {{ metadata.repo_url | tojson }},
+                                module: button.dataset.module,
+                                position: button.dataset.position,
+                                symbol: button.dataset.symbol
+                            });
+                            button.disabled = true;
+                            button.textContent = 'Generating...';
+                            fetch('/symbol-docs?' + params)
+                                .then(function (response) {
+                                    if (!response.ok) { throw new Error(response.statusText); }
+                                    return response.json();
+                                })
+                                .then(function (doc) {
+                                    button.parentElement.querySelector('.symbol-body').innerHTML = doc.html;
+                                    button.remove();
+                                })
+                                .catch(function () {
+                                    button.disabled = false;
+                                    button.textContent = 'Show detailed documentation';
+                                });
+                        });
+                    });
                 </script>
             </body>
             </html>
@@ -0,0 +1,92 @@
+import uuid
+import asyncio
+import logging
+from datetime import datetime
+from typing import Dict, Any, Callable, Awaitable, Optional, List
+
+from .cancellation import CancellationToken
+
+logger = logging.getLogger(__name__)
+
+
+class Job:
+    """A running documentation job shared by every request waiting on it"""
+
+    def __init__(self, key: str, repo_url: str, token: CancellationToken):
+        self.job_id = uuid.uuid4().hex
+        self.key = key
+        self.repo_url = repo_url
+        self.token = token
+        self.waiters = 0
+        self.started_at = datetime.now()
+        self.task: Optional[asyncio.Task] = None
+
+    def cancel(self):
+        """Cancel the job and stop any worker threads it started"""
+        self.token.cancel()
+        if self.task and not self.task.done():
+            self.task.cancel()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'job_id': self.job_id,
+            'repo_url': self.repo_url,
+            'waiters': self.waiters,
+            'started_at': self.started_at.isoformat(),
+            'deadline_seconds': self.token.remaining()
+        }
+
+
+class JobRegistry:
+    """
+    Tracks in-flight jobs by cache key so duplicate requests share one job.
+
+    A job is cancelled once its last waiting request goes away, so a client
+    disconnect stops cloning and LLM calls nobody is waiting for.
+    """
+
+    def __init__(self, job_timeout: Optional[float] = None):
+        self.job_timeout = job_timeout
+        self._by_key: Dict[str, Job] = {}
+        self._by_id: Dict[str, Job] = {}
+
+    def join(
+        self,
+        key: str,
+        repo_url: str,
+        run: Callable[[CancellationToken], Awaitable[Dict[str, Any]]]
+    ) -> Job:
+        """Return the in-flight job for `key`, starting `run(token)` if there is none"""
+        job = self._by_key.get(key)
+        if job is None:
+            job = Job(key, repo_url, CancellationToken(self.job_timeout))
+            job.task = asyncio.create_task(run(job.token))
+            self._by_key[key] = job
+            self._by_id[job.job_id] = job
+            job.task.add_done_callback(lambda _: self._forget(job))
+        job.waiters += 1
+        return job
+
+    def leave(self, job: Job):
+        """Stop waiting on a job, cancelling it if nobody else is waiting"""
+        job.waiters -= 1
+        if job.waiters <= 0 and not job.task.done():
+            logger.info(f"Cancelling job {job.job_id} for {job.repo_url}: no clients waiting")
+            job.cancel()
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancel a job by id; returns False when no such job is running"""
+        job = self._by_id.get(job_id)
+        if job is None:
+            return False
+        logger.info(f"Cancelling job {job_id} for {job.repo_url}")
+        job.cancel()
+        return True
+
+    def list(self) -> List[Dict[str, Any]]:
+        return [job.to_dict() for job in self._by_id.values()]
+
+    def _forget(self, job: Job):
+        if self._by_key.get(job.key) is job:
+            del self._by_key[job.key]
+        self._by_id.pop(job.job_id, None)
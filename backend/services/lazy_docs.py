@@ -0,0 +1,117 @@
+import asyncio
+import logging
+from typing import TYPE_CHECKING, Dict, Any, Optional, Set, Tuple
+
+from .cache_manager import CacheManager
+
+if TYPE_CHECKING:
+    from .doc_generator import DocGenerator
+
+logger = logging.getLogger(__name__)
+
+
+class LazySymbolDocs:
+    """
+    Generates deferred symbol documentation on first request.
+
+    Symbols are addressed by their position in the module, since names
+    can repeat within one. Each is generated at most once at a time; concurrent requests
+    for it share the same LLM call, and the result is cached. After a symbol
+    is generated, the next `prefetch` pending symbols of its module are
+    generated in the background, since readers tend to move down a module.
+    """
+
+    def __init__(
+        self,
+        doc_generator: 'DocGenerator',
+        cache_manager: CacheManager,
+        prefetch: int = 2,
+        max_prefetch_tasks: int = 8
+    ):
+        self.doc_generator = doc_generator
+        self.cache_manager = cache_manager
+        self.prefetch = prefetch
+        self.max_prefetch_tasks = max_prefetch_tasks
+        self._inflight: Dict[Tuple[str, str, int], asyncio.Task] = {}
+        self._prefetching: Set[asyncio.Task] = set()
+
+    @property
+    def metrics(self):
+        return self.doc_generator.metrics
+
+    async def get(
+        self,
+        cache_key: str,
+        module_name: str,
+        position: int,
+        symbol_name: Optional[str] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Return a symbol's documentation, generating it if needed.
+        
+        None when there is no such symbol, or when `symbol_name` is given and
+        the symbol at `position` has another name (a page older than the docs).
+        """
+        entry = await self.cache_manager.get_symbol_doc(cache_key, module_name, position)
+        if entry is None or (symbol_name is not None and entry['symbol']['name'] != symbol_name):
+            return None
+
+        documentation = entry['documentation']
+        cached = documentation is not None
+        if cached:
+            self.metrics.increment('lazy.hits')
+        else:
+            self.metrics.increment('lazy.misses')
+            # Shielded so a client that goes away does not waste a call others may be waiting on
+            documentation = await asyncio.shield(self._generate(cache_key, module_name, entry))
+            self._schedule_prefetch(cache_key, module_name, entry['position'] + 1)
+
+        # Imported here so it stays out of process startup
+        import markdown
+        
+        return {
+            'module': module_name,
+            'position': position,
+            'name': entry['symbol']['name'],
+            'type': entry['symbol']['type'],
+            'route': entry['route'],
+            'cached': cached,
+            'documentation': documentation,
+            'html': markdown.markdown(documentation, extensions=['codehilite', 'fenced_code'])
+        }
+
+    def _generate(self, cache_key: str, module_name: str, entry: Dict[str, Any]) -> asyncio.Task:
+        key = (cache_key, module_name, entry['position'])
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._document(cache_key, module_name, entry))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return task
+
+    async def _document(self, cache_key: str, module_name: str, entry: Dict[str, Any]) -> str:
+        symbol_doc = await self.doc_generator.document_symbol(entry['symbol'])
+        # Failed generations are returned but not cached, so the next request retries
+        if not symbol_doc.get('error'):
+            await self.cache_manager.cache_symbol_doc(
+                cache_key, module_name, entry['position'], symbol_doc['documentation']
+            )
+        return symbol_doc['documentation']
+
+    def _schedule_prefetch(self, cache_key: str, module_name: str, start: int):
+        if self.prefetch <= 0 or len(self._prefetching) >= self.max_prefetch_tasks:
+            return
+        task = asyncio.ensure_future(self._prefetch(cache_key, module_name, start))
+        self._prefetching.add(task)
+        task.add_done_callback(self._prefetching.discard)
+
+    async def _prefetch(self, cache_key: str, module_name: str, start: int):
+        try:
+            positions = await self.cache_manager.get_pending_symbols(cache_key, module_name, start, self.prefetch)
+            for position in positions:
+                entry = await self.cache_manager.get_symbol_doc(cache_key, module_name, position)
+                if entry is not None and entry['documentation'] is None:
+                    self.metrics.increment('lazy.prefetched')
+                    await self._generate(cache_key, module_name, entry)
+        except Exception as e:
+            logger.warning(f"Prefetching symbol docs in {module_name} failed: {str(e)}")
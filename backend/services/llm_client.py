@@ -0,0 +1,280 @@
+import os
+import asyncio
+import hashlib
+import random
+import time
+import logging
+from collections import deque
+from typing import Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class LLMBackendError(Exception):
+    """Raised when an LLM backend fails to produce a completion"""
+
+
+class LLMBackend:
+    """Base class for chat-completion backends used by DocGenerator"""
+
+    def __init__(self):
+        self.stats = {
+            'requests': 0,
+            'errors': 0,
+            'prompt_tokens': 0,
+            'completion_tokens': 0
+        }
+
+    async def complete(self, prompt: str, model: str, max_tokens: int, temperature: float) -> str:
+        """Return the completion text for a single-message prompt"""
+        raise NotImplementedError
+
+    def reset_stats(self):
+        """Reset request and token counters"""
+        for key in self.stats:
+            self.stats[key] = 0
+
+    def _record(self, prompt_tokens: int, completion_tokens: int):
+        self.stats['requests'] += 1
+        self.stats['prompt_tokens'] += prompt_tokens
+        self.stats['completion_tokens'] += completion_tokens
+
+
+class OpenAIBackend(LLMBackend):
+    """Backend that calls the OpenAI chat completions API"""
+
+    def __init__(self, api_key: Optional[str] = None):
+        super().__init__()
+        self.api_key = api_key or os.getenv('OPENAI_API_KEY')
+        self._client = None
+
+    @property
+    def client(self):
+        """Create the OpenAI client on first use"""
+        if self._client is None:
+            from openai import AsyncOpenAI
+            self._client = AsyncOpenAI(api_key=self.api_key)
+        return self._client
+
+    async def complete(self, prompt: str, model: str, max_tokens: int, temperature: float) -> str:
+        try:
+            response = await self.client.chat.completions.create(
+                model=model,
+                messages=[{"role": "user", "content": prompt}],
+                max_tokens=max_tokens,
+                temperature=temperature
+            )
+        except Exception as e:
+            self.stats['errors'] += 1
+            raise LLMBackendError(str(e))
+
+        usage = getattr(response, 'usage', None)
+        self._record(
+            getattr(usage, 'prompt_tokens', 0) or 0,
+            getattr(usage, 'completion_tokens', 0) or 0
+        )
+        return response.choices[0].message.content
+
+
+class FakeLLMBackend(LLMBackend):
+    """
+    Deterministic local stand-in for the OpenAI API.
+
+    Latency, output length and failures are drawn from a random generator
+    seeded with the prompt and how many times that prompt has been sent, so
+    a given sequence of calls always behaves the same regardless of
+    concurrency. A `tail_rate` fraction of calls take `tail_latency_ms`
+    instead, to simulate stragglers.
+    """
+
+    def __init__(
+        self,
+        latency_ms: float = 0.0,
+        latency_jitter_ms: float = 0.0,
+        output_ratio: float = 0.5,
+        output_jitter: float = 0.2,
+        error_rate: float = 0.0,
+        tail_rate: float = 0.0,
+        tail_latency_ms: float = 0.0,
+        seed: int = 0
+    ):
+        super().__init__()
+        self.latency_ms = latency_ms
+        self.latency_jitter_ms = latency_jitter_ms
+        self.output_ratio = output_ratio
+        self.output_jitter = output_jitter
+        self.error_rate = error_rate
+        self.tail_rate = tail_rate
+        self.tail_latency_ms = tail_latency_ms
+        self.seed = seed
+        self._attempts: Dict[str, int] = {}
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> 'FakeLLMBackend':
+        """Build a backend from a dict of constructor arguments"""
+        return cls(**config)
+
+    def _rng(self, prompt: str, model: str) -> random.Random:
+        key = f"{self.seed}:{model}:{prompt}"
+        attempt = self._attempts.get(key, 0)
+        self._attempts[key] = attempt + 1
+        digest = hashlib.sha256(f"{key}:{attempt}".encode()).digest()
+        return random.Random(int.from_bytes(digest[:8], 'big'))
+
+    async def complete(self, prompt: str, model: str, max_tokens: int, temperature: float) -> str:
+        rng = self._rng(prompt, model)
+
+        latency = self.latency_ms + rng.uniform(-self.latency_jitter_ms, self.latency_jitter_ms)
+        if rng.random() < self.tail_rate:
+            latency = self.tail_latency_ms
+        if latency > 0:
+            await asyncio.sleep(latency / 1000)
+
+        if rng.random() < self.error_rate:
+            self.stats['errors'] += 1
+            raise LLMBackendError("Simulated LLM failure")
+
+        ratio = self.output_ratio + rng.uniform(-self.output_jitter, self.output_jitter)
+        completion_tokens = max(1, min(max_tokens, int(max_tokens * ratio)))
+        self._record(estimate_tokens(prompt), completion_tokens)
+        return self._render(prompt, completion_tokens, rng)
+
+    def _render(self, prompt: str, completion_tokens: int, rng: random.Random) -> str:
+        title = prompt.strip().splitlines()[0][:80] if prompt.strip() else "Documentation"
+        words = ['the', 'module', 'provides', 'a', 'function', 'that', 'returns',
+                 'value', 'for', 'each', 'input', 'and', 'handles', 'errors']
+        body = ' '.join(rng.choice(words) for _ in range(completion_tokens))
+        return f"## {title}\n\n{body}\n\n```python\nexample()\n```\n"
+
+
+class HedgedBackend(LLMBackend):
+    """
+    Wraps another backend and hedges slow calls.
+
+    Once enough latencies have been observed, a call still running after the
+    observed p95 gets a second, identical request; whichever finishes first
+    wins and the other is cancelled. Hedges are limited to `budget` (a
+    fraction) of all requests so tail latency drops without doubling cost.
+    A losing attempt cancelled after the other won is still billed by the
+    provider, so it is recorded in `stats` with an estimated token charge.
+
+    The caller's limiter only covers the request it sent, so a hedge first
+    reserves its own prompt and output tokens from `limiter` (a TokenLimiter
+    or SharedRateLimiter) when one is set.
+    """
+
+    def __init__(
+        self,
+        backend: LLMBackend,
+        budget: float = 0.05,
+        percentile: float = 95.0,
+        min_samples: int = 20,
+        window: int = 500,
+        limiter=None
+    ):
+        super().__init__()
+        self.backend = backend
+        self.limiter = limiter
+        self.budget = budget
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self._latencies = deque(maxlen=window)
+        # Share the wrapped backend's counters and add hedging counters to them
+        self.stats = backend.stats
+        self.stats.setdefault('hedges', 0)
+        self.stats.setdefault('hedge_wins', 0)
+        self.stats.setdefault('hedges_cancelled', 0)
+        self._calls = 0
+        # Hedges started, including any still waiting for the limiter
+        self._hedges_issued = 0
+
+    def hedge_delay(self) -> Optional[float]:
+        """Seconds to wait before hedging, or None while there is too little data"""
+        if len(self._latencies) < self.min_samples:
+            return None
+        ordered = sorted(self._latencies)
+        index = min(len(ordered) - 1, int(len(ordered) * self.percentile / 100))
+        return ordered[index]
+
+    def _can_hedge(self) -> bool:
+        return self._hedges_issued < self.budget * self._calls
+
+    async def _hedge(self, prompt: str, model: str, max_tokens: int, temperature: float, sent: asyncio.Event) -> str:
+        if self.limiter is None:
+            return await self._send_hedge(prompt, model, max_tokens, temperature, sent)
+        async with self.limiter.reserve(estimate_tokens(prompt) + max_tokens):
+            return await self._send_hedge(prompt, model, max_tokens, temperature, sent)
+
+    async def _send_hedge(self, prompt: str, model: str, max_tokens: int, temperature: float, sent: asyncio.Event) -> str:
+        self.stats['hedges'] += 1
+        sent.set()
+        return await self.backend.complete(prompt, model, max_tokens, temperature)
+
+    async def complete(self, prompt: str, model: str, max_tokens: int, temperature: float) -> str:
+        self._calls += 1
+        start = time.monotonic()
+        primary = asyncio.ensure_future(self.backend.complete(prompt, model, max_tokens, temperature))
+        tasks = {primary}
+        hedge_sent = asyncio.Event()
+        result = None
+        try:
+            delay = self.hedge_delay()
+            if delay is not None:
+                await asyncio.wait(tasks, timeout=delay)
+                if not primary.done() and self._can_hedge():
+                    self._hedges_issued += 1
+                    hedge = asyncio.ensure_future(
+                        self._hedge(prompt, model, max_tokens, temperature, hedge_sent)
+                    )
+                    tasks.add(hedge)
+
+            # Take the first successful response; fail only when every attempt failed
+            pending = set(tasks)
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is not primary:
+                            self.stats['hedge_wins'] += 1
+                        self._latencies.append(time.monotonic() - start)
+                        result = task.result()
+                        return result
+                    error = task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                if task.done():
+                    continue
+                task.cancel()
+                # Only a loser that was actually sent is billed: a hedge still waiting
+                # for the limiter never reached the provider, and without a winner
+                # (an outer timeout or job cancel) no hedging happened to lose to
+                if result is not None and (task is primary or hedge_sent.is_set()):
+                    self.stats['hedges_cancelled'] += 1
+                    # Charge the prompt, and about as much output as the winner produced
+                    self._record(estimate_tokens(prompt), estimate_tokens(result))
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token)"""
+    return max(1, len(text) // 4)
+
+
+def create_backend(name: Optional[str] = None, hedge_budget: float = 0.0, **kwargs) -> LLMBackend:
+    """
+    Create an LLM backend by name ('openai' or 'fake').
+
+    A positive `hedge_budget` wraps the backend in a HedgedBackend.
+    """
+    name = (name or os.getenv('LLM_BACKEND', 'openai')).lower()
+    if name == 'openai':
+        backend = OpenAIBackend(**kwargs)
+    elif name == 'fake':
+        backend = FakeLLMBackend(**kwargs)
+    else:
+        raise ValueError(f"Unknown LLM backend: {name}")
+
+    if hedge_budget > 0:
+        return HedgedBackend(backend, budget=hedge_budget)
+    return backend
@@ -0,0 +1,37 @@
+import time
+from contextlib import contextmanager
+from collections import defaultdict
+from typing import Dict, Any
+
+
+class Metrics:
+    """In-process counters and stage timers for the documentation pipeline"""
+
+    def __init__(self):
+        self.counters: Dict[str, int] = defaultdict(int)
+        self.timings: Dict[str, float] = defaultdict(float)
+
+    def increment(self, name: str, value: int = 1):
+        """Increase a named counter"""
+        self.counters[name] += value
+
+    @contextmanager
+    def timer(self, name: str):
+        """Accumulate wall-clock seconds spent inside the block under `name`"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] += time.perf_counter() - start
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return a JSON-serialisable copy of all counters and timings"""
+        return {
+            'counters': dict(self.counters),
+            'timings': {name: round(seconds, 6) for name, seconds in self.timings.items()}
+        }
+
+    def reset(self):
+        """Clear all counters and timings"""
+        self.counters.clear()
+        self.timings.clear()
@@ -0,0 +1,276 @@
+import textwrap
+from typing import Any, Dict, List, Optional, Tuple
+
+from .llm_client import estimate_tokens
+from .metrics import Metrics
+
+TRUNCATION_MARK = ' [...]'
+SYMBOL_PRIORITY = {'class': 0, 'function': 1, 'method': 1, 'constant': 2}
+
+
+def truncate(text: str, max_tokens: int) -> str:
+    """Cut `text` to about `max_tokens` tokens, at a line or word boundary"""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    limit = max(0, max_tokens * 4 - len(TRUNCATION_MARK))
+    cut = text[:limit]
+    boundary = max(cut.rfind('\n'), cut.rfind(' '))
+    if boundary > limit // 2:
+        cut = cut[:boundary]
+    return cut.rstrip() + TRUNCATION_MARK
+
+
+def fit_lines(lines: List[str], max_tokens: int, summarize=None) -> Tuple[List[str], bool]:
+    """
+    Leading `lines` that fit in `max_tokens`, and whether any were dropped.
+
+    Dropped lines are replaced by one closing line, `summarize(dropped)`
+    (by default "- ... and N more").
+    """
+    summarize = summarize or (lambda dropped: f"- ... and {len(dropped)} more")
+    if sum(estimate_tokens(line) + 1 for line in lines) <= max_tokens:
+        return lines, False
+
+    # Leave room for the summary line of the worst case, where nearly everything is dropped
+    used = estimate_tokens(summarize(lines)) + 1
+    kept = []
+    for line in lines:
+        cost = estimate_tokens(line) + 1
+        if used + cost > max_tokens:
+            break
+        kept.append(line)
+        used += cost
+    return kept + [summarize(lines[len(kept):])], True
+
+
+def _first_line(text: Optional[str]) -> str:
+    return text.strip().splitlines()[0] if text and text.strip() else ''
+
+
+class PromptBuilder:
+    """
+    Builds the overview, module and symbol prompts within a token budget.
+
+    Each prompt is returned with the `max_tokens` its answer is expected to
+    need: a base per prompt kind plus an allowance per module, symbol,
+    method or argument it covers, up to the previous fixed limits. Prompt and
+    answer together must fit in `context_tokens`; inputs that would not
+    (long docstrings, modules with hundreds of symbols, repositories with
+    thousands of modules) are truncated, keeping the most important items
+    and summarising the rest as counts. Tokens are estimated locally with
+    `estimate_tokens`, so `safety_margin` of the context is left unused.
+    """
+
+    def __init__(
+        self,
+        context_tokens: int = 4096,
+        max_prompt_tokens: int = 3000,
+        max_docstring_tokens: int = 300,
+        safety_margin: float = 0.1,
+        metrics: Optional[Metrics] = None
+    ):
+        self.context_tokens = context_tokens
+        self.max_prompt_tokens = max_prompt_tokens
+        self.max_docstring_tokens = max_docstring_tokens
+        self.safety_margin = safety_margin
+        self.metrics = metrics or Metrics()
+
+    def prompt_budget(self, max_tokens: int) -> int:
+        """Tokens available to a prompt whose answer may use `max_tokens`"""
+        usable = int(self.context_tokens * (1 - self.safety_margin)) - max_tokens
+        return max(0, min(self.max_prompt_tokens, usable))
+
+    def overview(self, repo_data: Dict[str, Any]) -> Tuple[str, int]:
+        """Prompt and max_tokens for the repository overview"""
+        modules = repo_data['modules']
+        max_tokens = min(1500, 800 + 20 * len(modules))
+
+        # Modules arrive in importance order, so the least important are summarised away
+        module_lines = []
+        for module in modules:
+            symbols = [s['name'] for s in module['symbols']]
+            module_lines.append(f"- {module['module_name']}: {', '.join(symbols[:5])}")
+
+        template = textwrap.dedent("""\
+            Generate a comprehensive overview documentation for the Python repository '{repo_name}'.
+
+            Repository contains {count} modules with the following structure:
+            {structure}
+
+            Please provide:
+            1. A clear, engaging summary of what this repository does
+            2. Main purpose and use cases
+            3. Key components and their roles
+            4. Getting started guide
+            5. Installation instructions (if applicable)
+
+            Write in a professional, user-friendly tone that would help both developers and non-technical users understand the project.
+            Use markdown formatting for better readability.
+            """)
+        fields = {'repo_name': repo_data['repo_name'], 'count': len(modules)}
+        structure = self._fit(
+            module_lines, template, fields, max_tokens,
+            lambda dropped: f"- ... and {len(dropped)} more modules"
+        )
+        return template.format(structure=structure, **fields), max_tokens
+
+    def module(self, module: Dict[str, Any]) -> Tuple[str, int]:
+        """Prompt and max_tokens for a module overview"""
+        symbols = module['symbols']
+        constants = sum(1 for symbol in symbols if symbol['type'] == 'constant')
+        max_tokens = min(2000, 300 + 100 * (len(symbols) - constants) + 30 * constants)
+
+        # Classes, then functions, then constants survive when the list has to be cut
+        ordered = sorted(symbols, key=lambda symbol: SYMBOL_PRIORITY.get(symbol['type'], len(SYMBOL_PRIORITY)))
+        symbol_lines = [f"- {symbol['type']}: {symbol['name']}" for symbol in ordered]
+
+        def summarize(dropped: List[str]) -> str:
+            counts: Dict[str, int] = {}
+            for line in dropped:
+                kind = line[2:].split(':', 1)[0]
+                counts[kind] = counts.get(kind, 0) + 1
+            detail = ', '.join(f"{count} {kind}s" if count > 1 else f"1 {kind}" for kind, count in counts.items())
+            return f"- ... and {len(dropped)} more ({detail})"
+
+        template = textwrap.dedent("""\
+            Generate detailed documentation for the Python module '{module_name}' located at '{file_path}'.
+
+            Module docstring: {docstring}
+
+            The module contains the following symbols:
+            {symbols}
+
+            For each symbol, please provide:
+            1. A clear explanation of what it does
+            2. Parameters and return values (for functions/methods)
+            3. Usage examples where appropriate
+            4. Important notes or considerations
+
+            Write in markdown format with proper headers and code blocks.
+            Make it comprehensive but easy to understand.
+            """)
+        fields = {
+            'module_name': module['module_name'],
+            'file_path': module['file_path'],
+            'docstring': self._docstring(module.get('docstring'))
+        }
+        symbol_list = self._fit(symbol_lines, template, fields, max_tokens, summarize)
+        return template.format(symbols=symbol_list, **fields), max_tokens
+
+    def symbol(self, symbol: Dict[str, Any]) -> Tuple[str, int]:
+        """Prompt and max_tokens for a class, function, method or constant"""
+        if symbol['type'] == 'class':
+            return self._class(symbol)
+        if symbol['type'] in ['function', 'method']:
+            return self._function(symbol)
+        return self._constant(symbol)
+
+    def _class(self, symbol: Dict[str, Any]) -> Tuple[str, int]:
+        methods = symbol.get('methods', [])
+        max_tokens = min(1000, 400 + 60 * len(methods))
+        # Method docstrings are reduced to their summary line
+        method_lines = [
+            f"- {method['name']}: {_first_line(method.get('docstring')) or 'No docstring'}"
+            for method in methods
+        ]
+
+        template = textwrap.dedent("""\
+            Generate detailed documentation for the Python class '{name}'.
+
+            Class docstring: {docstring}
+            Base classes: {bases}
+
+            Methods:
+            {methods}
+
+            Please provide:
+            1. What this class represents and its purpose
+            2. Key functionality and use cases
+            3. Simple usage example
+            4. Important notes about initialization or usage
+
+            Format as markdown with code examples.
+            """)
+        fields = {
+            'name': symbol['name'],
+            'docstring': self._docstring(symbol.get('docstring')),
+            'bases': ', '.join(symbol.get('base_classes', []))
+        }
+        method_list = self._fit(
+            method_lines, template, fields, max_tokens,
+            lambda dropped: f"- ... and {len(dropped)} more methods"
+        )
+        return template.format(methods=method_list, **fields), max_tokens
+
+    def _function(self, symbol: Dict[str, Any]) -> Tuple[str, int]:
+        args = symbol.get('args', [])
+        max_tokens = min(1000, 250 + 50 * len(args) + 10 * min(symbol.get('statement_count', 0), 20))
+        arg_lines = [f"- {arg['name']}: {arg['annotation'] or 'Any'}" for arg in args]
+
+        template = textwrap.dedent("""\
+            Generate detailed documentation for the Python {kind} '{name}'.
+
+            Docstring: {docstring}
+
+            Parameters:
+            {parameters}
+
+            Returns: {returns}
+
+            Please provide:
+            1. What this {kind} does
+            2. Parameter descriptions
+            3. Return value description
+            4. Usage example
+            5. Any important notes or exceptions
+
+            Format as markdown with code examples.
+            """)
+        fields = {
+            'kind': symbol['type'],
+            'name': symbol['name'],
+            'docstring': self._docstring(symbol.get('docstring')),
+            'returns': symbol.get('returns', 'Not specified')
+        }
+        parameters = self._fit(
+            arg_lines, template, fields, max_tokens,
+            lambda dropped: f"- ... and {len(dropped)} more parameters"
+        )
+        return template.format(parameters=parameters, **fields), max_tokens
+
+    def _constant(self, symbol: Dict[str, Any]) -> Tuple[str, int]:
+        max_tokens = 250
+        template = textwrap.dedent("""\
+            Generate documentation for the Python constant '{name}'.
+
+            Value: {value}
+
+            Please provide:
+            1. What this constant represents
+            2. Its purpose and usage
+            3. Simple usage example
+
+            Format as markdown.
+            """)
+        value = str(symbol.get('value', 'Not available'))
+        budget = self.prompt_budget(max_tokens) - estimate_tokens(template)
+        fitted = truncate(value, max(1, budget))
+        if fitted != value:
+            self.metrics.increment('prompts.truncated')
+        return template.format(name=symbol['name'], value=fitted), max_tokens
+
+    def _docstring(self, docstring: Optional[str]) -> str:
+        if not docstring:
+            return 'No docstring available'
+        fitted = truncate(docstring, self.max_docstring_tokens)
+        if fitted != docstring:
+            self.metrics.increment('prompts.truncated')
+        return fitted
+
+    def _fit(self, lines: List[str], template: str, fields: Dict[str, Any], max_tokens: int, summarize) -> str:
+        """Join as many `lines` as fit in what the filled-in template leaves of the prompt budget"""
+        fixed = estimate_tokens(template) + sum(estimate_tokens(str(value)) for value in fields.values())
+        kept, truncated = fit_lines(lines, max(0, self.prompt_budget(max_tokens) - fixed), summarize)
+        if truncated:
+            self.metrics.increment('prompts.truncated')
+        return '\n'.join(kept)
@@ -0,0 +1,84 @@
+import os
+import re
+from typing import Dict, List, Any, Optional, Tuple
+
+from .import_graph import fan_in
+
+# Path components marking trees that are not part of the documented API
+SKIPPED_DIRECTORIES = {
+    'test': {'tests', 'test'},
+    'migration': {'migrations', 'alembic'},
+    'vendored': {'vendor', 'vendored', '_vendor', 'third_party', 'thirdparty', 'site-packages'},
+}
+TEST_FILE_PATTERN = re.compile(r'^(test_.*|.*_test|conftest)\.py$')
+GENERATED_FILE_PATTERN = re.compile(r'.*_pb2(_grpc)?\.py$')
+# Standard markers written by code generators into a file's leading comments
+GENERATED_HEADER_PATTERN = re.compile(
+    r'do not edit|generated by the protocol buffer compiler|code generated .* do not edit',
+    re.IGNORECASE
+)
+
+# Directories that are usually supporting material rather than core API
+SECONDARY_DIRECTORIES = {'examples', 'example', 'docs', 'scripts', 'benchmarks', 'tools'}
+
+
+def classify_module(module: Dict[str, Any]) -> Optional[str]:
+    """Return why a module should be skipped ('test', 'generated', ...), or None to keep it"""
+    parts = module['file_path'].replace(os.sep, '/').split('/')
+    filename = parts[-1]
+
+    if TEST_FILE_PATTERN.match(filename):
+        return 'test'
+    if module.get('generated') or GENERATED_FILE_PATTERN.match(filename):
+        return 'generated'
+    for reason, directories in SKIPPED_DIRECTORIES.items():
+        if any(part in directories for part in parts[:-1]):
+            return reason
+    return None
+
+
+def score_module(module: Dict[str, Any], fan_in_count: int) -> float:
+    """
+    Importance of a module: how many modules import it, how much public
+    surface it has, and where it sits in the tree.
+    """
+    parts = module['file_path'].replace(os.sep, '/').split('/')
+    symbols = module['symbols']
+    public_surface = len(symbols) + sum(len(s.get('methods', [])) for s in symbols if s['type'] == 'class')
+
+    score = 3.0 * fan_in_count + min(public_surface, 50)
+    if parts[-1] == '__init__.py':
+        score += 5.0
+    # Shallow modules tend to be entry points; deep ones are implementation detail
+    score -= len(parts) - 1
+    if any(part in SECONDARY_DIRECTORIES for part in parts[:-1]):
+        score *= 0.5
+    return score
+
+
+def rank_modules(
+    modules: List[Dict[str, Any]],
+    import_graph: Dict[str, List[str]]
+) -> Tuple[List[Dict[str, Any]], List[Dict[str, str]]]:
+    """
+    Drop test, generated, migration and vendored modules and order the rest
+    by importance, most important first.
+
+    Returns:
+        The ranked modules (each with an 'importance' score) and a list of
+        skipped modules with the reason they were skipped
+    """
+    counts = fan_in(import_graph)
+    ranked = []
+    skipped = []
+
+    for module in modules:
+        reason = classify_module(module)
+        if reason:
+            skipped.append({'module_name': module['module_name'], 'reason': reason})
+            continue
+        module['importance'] = round(score_module(module, counts.get(module['module_name'], 0)), 2)
+        ranked.append(module)
+
+    ranked.sort(key=lambda m: (-m['importance'], m['module_name']))
+    return ranked, skipped
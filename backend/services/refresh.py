@@ -0,0 +1,144 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Optional, Set, Tuple
+
+from .admission import AdmissionController, OverloadedError
+from .cache_manager import CacheManager
+from .metrics import Metrics
+
+logger = logging.getLogger(__name__)
+
+
+def parse_hours(spec: str) -> Optional[Tuple[int, int]]:
+    """Parse an 'H-H' local-hour window such as '1-6' or '22-5'; '' means any time"""
+    if not spec.strip():
+        return None
+    start, end = (int(hour) % 24 for hour in spec.split('-'))
+    return start, end
+
+
+class RefreshScheduler:
+    """
+    Regenerates popular cached repositories before their entries expire.
+
+    Every `interval` seconds, entries read at least `min_hits` times that
+    expire within `window` seconds are refreshed, most-read first. Refreshes
+    run only while the pipeline is idle, at most `max_per_cycle` per cycle,
+    and only inside the `off_peak` hours unless the entry would otherwise
+    expire before the next cycle. Entries served stale (see
+    CacheManager.stale_seconds) are revalidated immediately via `revalidate`.
+    """
+
+    def __init__(
+        self,
+        cache_manager: CacheManager,
+        admission: AdmissionController,
+        refresh: Callable[[str, str], Awaitable[None]],
+        metrics: Optional[Metrics] = None,
+        interval: float = 300.0,
+        window: float = 86400.0,
+        min_hits: float = 3,
+        max_per_cycle: int = 2,
+        off_peak: Optional[Tuple[int, int]] = None
+    ):
+        self.cache_manager = cache_manager
+        self.admission = admission
+        self.refresh = refresh
+        self.metrics = metrics or Metrics()
+        self.interval = interval
+        self.window = window
+        self.min_hits = min_hits
+        self.max_per_cycle = max_per_cycle
+        self.off_peak = off_peak
+        self._refreshing: Set[str] = set()
+        self._tasks: Set[asyncio.Task] = set()
+        self._loop_task: Optional[asyncio.Task] = None
+
+    def start(self):
+        """Start the background refresh loop"""
+        if self._loop_task is None:
+            self._loop_task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the loop and any refreshes still running"""
+        tasks = [task for task in [self._loop_task, *self._tasks] if task]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._loop_task = None
+
+    def is_off_peak(self, now: Optional[datetime] = None) -> bool:
+        if self.off_peak is None:
+            return True
+        hour = (now or datetime.now()).hour
+        start, end = self.off_peak
+        if start <= end:
+            return start <= hour < end
+        return hour >= start or hour < end
+
+    def has_capacity(self) -> bool:
+        """Refresh only while at least half the job slots are free and nothing is queued"""
+        return (
+            self.admission.queued_jobs == 0
+            and self.admission.active_jobs < max(1, self.admission.max_concurrent_jobs // 2)
+        )
+
+    def revalidate(self, repo_url: str, cache_key: str):
+        """Refresh an entry in the background unless a refresh is already running"""
+        if cache_key in self._refreshing:
+            return
+        self._refreshing.add(cache_key)
+        task = asyncio.create_task(self._refresh(repo_url, cache_key))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def run_cycle(self) -> int:
+        """Start refreshes for entries that are due; returns how many were started"""
+        if not self.has_capacity():
+            self.metrics.increment('refresh.skipped_busy')
+            return 0
+
+        now = datetime.now()
+        if self.is_off_peak(now):
+            horizon = now + timedelta(seconds=self.window)
+        else:
+            # Outside off-peak hours only refresh what would expire before the next cycle
+            horizon = now + timedelta(seconds=2 * self.interval)
+
+        candidates = await self.cache_manager.get_refresh_candidates(
+            horizon, self.min_hits, self.max_per_cycle + len(self._refreshing)
+        )
+        started = 0
+        for candidate in candidates:
+            if started >= self.max_per_cycle:
+                break
+            if candidate['cache_key'] in self._refreshing:
+                continue
+            logger.info(f"Refreshing {candidate['repo_url']} ahead of expiry ({candidate['hits']:.0f} hits)")
+            self.revalidate(candidate['repo_url'], candidate['cache_key'])
+            started += 1
+        return started
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.run_cycle()
+            except Exception as e:
+                logger.error(f"Refresh cycle failed: {str(e)}")
+
+    async def _refresh(self, repo_url: str, cache_key: str):
+        self.metrics.increment('refresh.started')
+        try:
+            await self.refresh(repo_url, cache_key)
+            self.metrics.increment('refresh.completed')
+        except asyncio.CancelledError:
+            raise
+        except OverloadedError:
+            self.metrics.increment('refresh.rejected')
+        except Exception as e:
+            self.metrics.increment('refresh.failed')
+            logger.warning(f"Refreshing {repo_url} failed: {str(e)}")
+        finally:
+            self._refreshing.discard(cache_key)
@@ -1,84 +1,177 @@
 import os
 import ast
+import asyncio
 import tempfile
 import shutil
-from typing import Dict, List, Any
-from git import Repo
+import time
+from typing import Dict, List, Any, Optional, Tuple
 import logging
 
+from .metrics import Metrics
+from .cancellation import CancellationToken, JobCancelledError
+from .import_graph import build_import_graph, build_dependency_index
+from .ranking import GENERATED_HEADER_PATTERN, rank_modules
+
 logger = logging.getLogger(__name__)
 
 class RepoProcessor:
     """Service for processing GitHub repositories and extracting Python symbols"""
     
-    def __init__(self):
-        self.temp_dir = None
+    def __init__(self, metrics: Optional[Metrics] = None):
+        self.metrics = metrics or Metrics()
         
-    async def process_repository(self, repo_url: str) -> Dict[str, Any]:
+    async def process_repository(
+        self,
+        repo_url: str,
+        cancel_token: Optional[CancellationToken] = None
+    ) -> Dict[str, Any]:
         """
         Process a GitHub repository and extract all Python symbols
         
         Args:
-            repo_url: GitHub repository URL
+            repo_url: GitHub repository URL, or a path to a local checkout
+            cancel_token: Token checked between files; cancelling it stops
+                the clone and the parse early
             
         Returns:
-            Dictionary containing repository data and extracted symbols
+            Dictionary containing repository data, the import graph, a
+            package-level dependency index and the extracted symbols. Modules are ordered by importance; test,
+            generated, migration and vendored modules are listed under
+            'skipped_modules' instead.
         """
+        token = cancel_token or CancellationToken()
+        temp_dir = None
         try:
             # Clone repository
-            repo_data = await self._clone_repository(repo_url)
-            
-            # Extract Python files
-            python_files = self._find_python_files(repo_data['local_path'])
-            
-            # Parse each Python file
-            parsed_modules = []
-            for file_path in python_files:
-                try:
-                    module_data = self._parse_python_file(file_path, repo_data['local_path'])
-                    if module_data['symbols']:  # Only include modules with symbols
-                        parsed_modules.append(module_data)
-                except Exception as e:
-                    logger.warning(f"Error parsing {file_path}: {str(e)}")
-                    continue
+            with self.metrics.timer('repo.clone'):
+                repo_data = await self._clone_repository(repo_url, token)
+            temp_dir = repo_data.get('temp_dir')
             
-            # Clean up temporary directory
-            self._cleanup()
+            # Parsing is CPU-bound, so keep it off the event loop
+            with self.metrics.timer('repo.parse'):
+                python_files, all_modules = await asyncio.to_thread(
+                    self._parse_repository, repo_data['local_path'], token
+                )
+            
+            # Rank modules by importance so LLM budget is spent on the core API first
+            with self.metrics.timer('repo.rank'):
+                import_graph = build_import_graph(all_modules)
+                parsed_modules, skipped_modules = rank_modules(
+                    [module for module in all_modules if module['symbols']],  # Only include modules with symbols
+                    import_graph
+                )
+                # Package-level index for the architecture diagram, from the same pass
+                dependency_index = build_dependency_index(
+                    all_modules,
+                    import_graph,
+                    {module['module_name'] for module in skipped_modules}
+                )
             
             return {
                 'repo_url': repo_url,
                 'repo_name': repo_data['name'],
                 'modules': parsed_modules,
+                'skipped_modules': skipped_modules,
+                'import_graph': import_graph,
+                'dependency_index': dependency_index,
                 'total_files': len(python_files),
                 'parsed_modules': len(parsed_modules)
             }
             
+        except asyncio.CancelledError:
+            # Stop worker threads that are still cloning or parsing
+            token.cancel()
+            raise
+        except JobCancelledError:
+            raise
         except Exception as e:
-            self._cleanup()
             raise Exception(f"Error processing repository: {str(e)}")
+        finally:
+            # Clean up temporary directory
+            await asyncio.shield(asyncio.to_thread(self._cleanup, temp_dir))
     
-    async def _clone_repository(self, repo_url: str) -> Dict[str, str]:
+    def _parse_repository(
+        self,
+        repo_path: str,
+        token: CancellationToken
+    ) -> Tuple[List[str], List[Dict[str, Any]]]:
+        """Find and parse every Python file under repo_path"""
+        python_files = self._find_python_files(repo_path)
+        
+        parsed_modules = []
+        for file_path in python_files:
+            token.check()
+            try:
+                parsed_modules.append(self._parse_python_file(file_path, repo_path))
+            except Exception as e:
+                logger.warning(f"Error parsing {file_path}: {str(e)}")
+                continue
+        
+        return python_files, parsed_modules
+    
+    async def _clone_repository(self, repo_url: str, token: CancellationToken) -> Dict[str, Any]:
         """Clone repository to temporary directory"""
+        temp_dir = None
         try:
-            # Create temporary directory
-            self.temp_dir = tempfile.mkdtemp()
+            token.check()
+            
+            # Local checkouts are parsed in place and never cleaned up
+            if os.path.isdir(repo_url):
+                return {
+                    'name': os.path.basename(os.path.abspath(repo_url)),
+                    'local_path': repo_url,
+                    'temp_dir': None,
+                    'url': repo_url
+                }
+            
+            # Create a temporary directory per job so concurrent jobs never share one
+            temp_dir = tempfile.mkdtemp()
             
             # Extract repository name from URL
             repo_name = repo_url.split('/')[-1].replace('.git', '')
             
             # Clone repository (shallow clone for speed)
             logger.info(f"Cloning repository: {repo_url}")
-            repo = Repo.clone_from(repo_url, self.temp_dir, depth=1)
+            await asyncio.to_thread(self._run_clone, repo_url, temp_dir, token)
             
             return {
                 'name': repo_name,
-                'local_path': self.temp_dir,
+                'local_path': temp_dir,
+                'temp_dir': temp_dir,
                 'url': repo_url
             }
             
+        except JobCancelledError:
+            self._cleanup(temp_dir)
+            raise
+        except asyncio.CancelledError:
+            # The clone thread kills git once it sees the cancelled token
+            token.cancel()
+            self._cleanup(temp_dir)
+            raise
         except Exception as e:
+            self._cleanup(temp_dir)
             raise Exception(f"Error cloning repository: {str(e)}")
     
+    def _run_clone(self, repo_url: str, temp_dir: str, token: CancellationToken):
+        """Run a shallow git clone, killing it if the token is cancelled"""
+        # GitPython is only needed for clones, so keep it out of process startup
+        from git import Git
+        
+        Git.check_unsafe_protocols(repo_url)
+        proc = Git().execute(
+            ['git', 'clone', '--depth=1', '--', repo_url, temp_dir],
+            as_process=True
+        )
+        while proc.proc.poll() is None:
+            if token.cancelled or token.expired:
+                proc.proc.kill()
+                proc.proc.wait()
+                self._cleanup(temp_dir)
+                token.check()
+            time.sleep(0.05)
+        proc.wait()
+    
     def _find_python_files(self, repo_path: str) -> List[str]:
         """Find all Python files in the repository"""
         python_files = []
@@ -106,10 +199,13 @@ class RepoProcessor:
             rel_path = os.path.relpath(file_path, repo_root)
             
             # Extract module information
+            module_name = self._get_module_name(rel_path)
             module_info = {
                 'file_path': rel_path,
-                'module_name': self._get_module_name(rel_path),
+                'module_name': module_name,
                 'docstring': ast.get_docstring(tree),
+                'generated': self._looks_generated(content),
+                'imports': [],
                 'symbols': []
             }
             
@@ -131,6 +227,12 @@ class RepoProcessor:
                         if isinstance(target, ast.Name) and target.id.isupper():
                             const_info = self._extract_constant_info(node, target.id)
                             module_info['symbols'].append(const_info)
+                
+                elif isinstance(node, ast.Import):
+                    module_info['imports'].extend(alias.name for alias in node.names)
+                
+                elif isinstance(node, ast.ImportFrom):
+                    module_info['imports'].extend(self._import_from_targets(node, module_name))
             
             return module_info
             
@@ -141,6 +243,35 @@ class RepoProcessor:
         """Convert file path to module name"""
         return rel_path.replace('/', '.').replace('.py', '')
     
+    def _import_from_targets(self, node: ast.ImportFrom, module_name: str) -> List[str]:
+        """Absolute candidates for a `from ... import ...` statement, resolving relative levels"""
+        base = node.module or ''
+        if node.level:
+            # The importing module's package, then one level up per extra dot
+            package = module_name.split('.')[:-1]
+            if node.level > 1:
+                package = package[:-(node.level - 1)]
+            base = '.'.join(package + ([node.module] if node.module else []))
+        
+        targets = [base] if base else []
+        for alias in node.names:
+            if alias.name != '*':
+                targets.append(f"{base}.{alias.name}" if base else alias.name)
+        return targets
+    
+    def _looks_generated(self, content: str) -> bool:
+        """Whether the file's leading comment lines carry a generated-code marker"""
+        for line in content.splitlines():
+            line = line.strip()
+            if not line:
+                continue
+            if not line.startswith('#'):
+                # Docstrings and code are never read as markers
+                return False
+            if GENERATED_HEADER_PATTERN.search(line):
+                return True
+        return False
+    
     def _extract_class_info(self, node: ast.ClassDef) -> Dict[str, Any]:
         """Extract information from a class definition"""
         methods = []
@@ -169,15 +300,30 @@ class RepoProcessor:
                 'annotation': ast.unparse(arg.annotation) if arg.annotation else None
             })
         
+        # Statements after the docstring, used to spot trivial one-liners
+        body = node.body[1:] if ast.get_docstring(node) is not None else node.body
+        
         return {
             'type': 'method' if is_method else 'function',
             'name': node.name,
             'docstring': ast.get_docstring(node),
             'args': args,
             'returns': ast.unparse(node.returns) if node.returns else None,
+            'decorators': [ast.unparse(decorator) for decorator in node.decorator_list],
+            'statement_count': len(body),
+            'is_accessor': self._is_accessor(node, body),
             'line_number': node.lineno
         }
     
+    def _is_accessor(self, node: ast.FunctionDef, body: List[ast.stmt]) -> bool:
+        """Whether a function only returns an attribute, name or literal"""
+        if len(node.args.args) > 1 or len(body) != 1:
+            return False
+        statement = body[0]
+        return isinstance(statement, ast.Return) and isinstance(
+            statement.value, (ast.Attribute, ast.Name, ast.Constant)
+        )
+    
     def _extract_constant_info(self, node: ast.Assign, name: str) -> Dict[str, Any]:
         """Extract information from a constant assignment"""
         try:
@@ -192,8 +338,7 @@ class RepoProcessor:
             'line_number': node.lineno
         }
     
-    def _cleanup(self):
+    def _cleanup(self, temp_dir: Optional[str]):
         """Clean up temporary directory"""
-        if self.temp_dir and os.path.exists(self.temp_dir):
-            shutil.rmtree(self.temp_dir)
-            self.temp_dir = None 
\ No newline at end of file
+        if temp_dir and os.path.exists(temp_dir):
+            shutil.rmtree(temp_dir, ignore_errors=True) 
\ No newline at end of file
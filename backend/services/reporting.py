@@ -0,0 +1,36 @@
+import os
+import json
+import platform
+import subprocess
+from datetime import datetime
+from typing import Dict, Any, Optional
+
+
+def environment_info() -> Dict[str, Any]:
+    """Describe the commit and interpreter a benchmark or batch run ran on"""
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except Exception:
+        commit = 'unknown'
+
+    return {
+        'commit': commit,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'timestamp': datetime.now().isoformat()
+    }
+
+
+def write_report(report: Dict[str, Any], path: Optional[str]):
+    """Write a report as JSON to `path`, or to stdout when no path is given"""
+    content = json.dumps(report, indent=2, sort_keys=True)
+    if path:
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(content + '\n')
+    else:
+        print(content)
@@ -0,0 +1,98 @@
+from typing import Dict, Any
+
+# Route names, cheapest first
+TEMPLATE = 'template'
+SMALL = 'small'
+LARGE = 'large'
+
+
+class SymbolRouter:
+    """
+    Decides how each symbol gets documented.
+
+    Trivial symbols (constants, documented one-line functions and simple
+    accessors) get deterministic template docs with no LLM call. Classes go
+    to the large model and everything else to the small, faster model.
+    """
+
+    def __init__(self, large_model: str = "gpt-4", small_model: str = "gpt-3.5-turbo"):
+        self.large_model = large_model
+        self.small_model = small_model
+
+    def route(self, symbol: Dict[str, Any]) -> str:
+        """Return TEMPLATE, SMALL or LARGE for a symbol"""
+        if symbol['type'] == 'constant':
+            return TEMPLATE
+        if symbol['type'] == 'class':
+            return LARGE
+        if symbol.get('is_accessor'):
+            return TEMPLATE
+        if symbol.get('docstring') and symbol.get('statement_count', 0) <= 1:
+            return TEMPLATE
+        return SMALL
+
+    def model_for(self, route: str) -> str:
+        """Model name used for an LLM route"""
+        return self.large_model if route == LARGE else self.small_model
+
+    def render_template(self, symbol: Dict[str, Any]) -> str:
+        """Build markdown documentation from a symbol's signature, docstring and value"""
+        if symbol['type'] == 'constant':
+            return (
+                f"```python\n{symbol['name']} = {symbol.get('value', '...')}\n```\n\n"
+                f"Module-level constant `{symbol['name']}`."
+            )
+
+        if symbol['type'] == 'class':
+            bases = ', '.join(symbol.get('base_classes', []))
+            signature = f"class {symbol['name']}({bases})" if bases else f"class {symbol['name']}"
+            methods = ''.join(f"\n- `{method['name']}`" for method in symbol.get('methods', []))
+            description = symbol.get('docstring') or f"Class `{symbol['name']}`."
+            doc = f"```python\n{signature}\n```\n\n{description}"
+            return f"{doc}\n\n**Methods:**\n{methods}" if methods else doc
+
+        description = symbol.get('docstring') or self._describe_accessor(symbol)
+        doc = f"```python\n{self.signature(symbol)}\n```\n\n{description}"
+        if symbol.get('returns'):
+            doc += f"\n\n**Returns:** `{symbol['returns']}`"
+        return doc
+
+    def render_module_template(self, module: Dict[str, Any]) -> str:
+        """Build a module summary from its docstring and symbol list"""
+        description = module.get('docstring') or f"Module `{module['module_name']}`."
+        symbols = ''.join(
+            f"\n- {symbol['type']} `{symbol['name']}`" for symbol in module['symbols']
+        )
+        return f"{description}\n\n**Contents:**\n{symbols}"
+
+    def render_overview_template(self, repo_data: Dict[str, Any]) -> str:
+        """Build a repository overview listing its most important modules"""
+        modules = ''.join(
+            f"\n- `{module['module_name']}`" + (
+                f": {module['docstring'].splitlines()[0]}" if module.get('docstring') else ''
+            )
+            for module in repo_data['modules'][:20]
+        )
+        return (
+            f"# {repo_data['repo_name']}\n\n"
+            f"Repository with {len(repo_data['modules'])} documented modules.\n\n"
+            f"**Key modules:**\n{modules}"
+        )
+
+    def signature(self, symbol: Dict[str, Any]) -> str:
+        """Reconstruct a `def` line from parsed function metadata"""
+        args = []
+        for arg in symbol.get('args', []):
+            args.append(f"{arg['name']}: {arg['annotation']}" if arg.get('annotation') else arg['name'])
+        returns = f" -> {symbol['returns']}" if symbol.get('returns') else ''
+        return f"def {symbol['name']}({', '.join(args)}){returns}"
+
+    def _describe_accessor(self, symbol: Dict[str, Any]) -> str:
+        name = symbol['name']
+        for prefix in ('get_', 'is_', 'has_'):
+            if name.startswith(prefix):
+                subject = name[len(prefix):].replace('_', ' ')
+                if prefix == 'get_':
+                    return f"Returns the {subject}."
+                return f"Returns whether it {prefix[:-1]} {subject}."
+        return f"Returns the {name.replace('_', ' ')}."
@@ -0,0 +1,282 @@
+import re
+import heapq
+import itertools
+from bisect import bisect_left
+from collections import OrderedDict
+from typing import Dict, List, Any, Optional, Set, Tuple
+
+WORD_PATTERN = re.compile(r'[A-Za-z0-9_]+')
+CAMEL_PATTERN = re.compile(r'[A-Z]+(?![a-z])|[A-Z]?[a-z]+|[0-9]+')
+STOP_WORDS = {
+    'the', 'and', 'for', 'that', 'this', 'with', 'from', 'are', 'was', 'its',
+    'into', 'can', 'will', 'not', 'all', 'any', 'each', 'when', 'which', 'has',
+    'have', 'been', 'be', 'is', 'it', 'of', 'to', 'in', 'on', 'or', 'an', 'as', 'by'
+}
+
+# Score for a query term found in an entry's name versus its signature or text
+NAME_WEIGHT = 10
+TEXT_WEIGHT = 1
+# A query term shorter than this only matches whole terms, not prefixes
+MIN_PREFIX_LENGTH = 2
+# Cap on how many index terms a single query prefix may expand to
+MAX_PREFIX_EXPANSION = 64
+SUMMARY_LENGTH = 160
+# Posting lists are stored sorted by static rank since this version
+INDEX_VERSION = 2
+
+
+def tokenize(text: str) -> Set[str]:
+    """Lower-cased words plus their snake_case and CamelCase parts"""
+    terms = set()
+    for word in WORD_PATTERN.findall(text):
+        terms.add(word.lower())
+        for part in word.split('_'):
+            for piece in CAMEL_PATTERN.findall(part):
+                terms.add(piece.lower())
+    return {term for term in terms if len(term) > 1 and term not in STOP_WORDS}
+
+
+def _summary(documentation: str) -> str:
+    """First line of prose in a markdown document, outside code blocks, tables and lists"""
+    in_code = False
+    for line in documentation.splitlines():
+        line = line.strip()
+        if line.startswith(('```', '~~~')):
+            in_code = not in_code
+            continue
+        if in_code or line.startswith(('|', '-')):
+            continue
+        line = line.strip('#*`> ').strip()
+        if line:
+            return line[:SUMMARY_LENGTH]
+    return ''
+
+
+def _static_rank(entries: List[Dict[str, Any]]) -> List[int]:
+    """Position of each entry in the order ties are broken in: shorter names, then earlier entries"""
+    order = sorted(range(len(entries)), key=lambda entry_id: (len(entries[entry_id]['name']), entry_id))
+    rank = [0] * len(entries)
+    for position, entry_id in enumerate(order):
+        rank[entry_id] = position
+    return rank
+
+
+def _signature(symbol: Dict[str, Any], router) -> str:
+    metadata = symbol.get('metadata', {})
+    if symbol['type'] == 'class':
+        bases = ', '.join(metadata.get('base_classes', []))
+        return f"class {symbol['name']}({bases})" if bases else f"class {symbol['name']}"
+    if symbol['type'] in ('function', 'method'):
+        return router.signature(metadata)
+    return symbol['name']
+
+
+def build_search_index(documentation: Dict[str, Any], router) -> Dict[str, Any]:
+    """
+    Build a compact, JSON-serialisable search index over generated docs.
+
+    Must run on the markdown documentation, before it is rendered to HTML.
+    Names, signatures and doc text are tokenised once here, so lookups only
+    touch the posting lists and never rescan the documentation. Posting
+    lists are sorted by static rank, so lookups can stop after `limit` hits.
+    """
+    entries: List[Dict[str, Any]] = []
+    names: Dict[str, List[int]] = {}
+    text: Dict[str, List[int]] = {}
+
+    def add(entry: Dict[str, Any], name_terms: Set[str], text_terms: Set[str]):
+        entry_id = len(entries)
+        entries.append(entry)
+        for term in name_terms:
+            names.setdefault(term, []).append(entry_id)
+        for term in text_terms - name_terms:
+            text.setdefault(term, []).append(entry_id)
+
+    for module in documentation['modules']:
+        module_name = module['module_name']
+        add(
+            {
+                'kind': 'module',
+                'name': module_name,
+                'module': module_name,
+                'signature': module['file_path'],
+                'summary': _summary(module['overview'])
+            },
+            tokenize(module_name),
+            tokenize(module['overview'])
+        )
+        for symbol in module['symbols']:
+            signature = _signature(symbol, router)
+            # A class is also found by the names of its methods
+            methods = ' '.join(method['name'] for method in symbol.get('metadata', {}).get('methods', []))
+            add(
+                {
+                    'kind': symbol['type'],
+                    'name': symbol['name'],
+                    'module': module_name,
+                    'signature': signature,
+                    'summary': _summary(symbol['documentation'])
+                },
+                tokenize(symbol['name']),
+                tokenize(signature) | tokenize(methods) | tokenize(symbol['documentation'])
+            )
+
+    rank = _static_rank(entries)
+    for postings in (names, text):
+        for entry_ids in postings.values():
+            entry_ids.sort(key=rank.__getitem__)
+    return {'version': INDEX_VERSION, 'entries': entries, 'names': names, 'text': text}
+
+
+class SearchIndex:
+    """Query side of an index produced by build_search_index"""
+
+    def __init__(self, data: Dict[str, Any]):
+        self.entries = data['entries']
+        self.names = data['names']
+        self.text = data['text']
+        self.doc_url = data.get('doc_url')
+        self._rank = _static_rank(self.entries)
+        if data.get('version', 1) < INDEX_VERSION:
+            # Indexes cached before posting lists were rank-ordered
+            for postings in (self.names, self.text):
+                for entry_ids in postings.values():
+                    entry_ids.sort(key=self._rank.__getitem__)
+        # Sorted term lists so prefix lookups are a binary search
+        self._name_terms = sorted(self.names)
+        self._text_terms = sorted(self.text)
+        # Posting lists as sets, built on first probe and kept with the index
+        self._members: Dict[Tuple[bool, str], Set[int]] = {}
+
+    def _expand(self, term: str, postings: Dict[str, List[int]], terms: List[str]) -> List[str]:
+        if len(term) < MIN_PREFIX_LENGTH:
+            return [term] if term in postings else []
+        matches = []
+        position = bisect_left(terms, term)
+        while position < len(terms) and terms[position].startswith(term) and len(matches) < MAX_PREFIX_EXPANSION:
+            matches.append(terms[position])
+            position += 1
+        return matches
+
+    def _tiers(self, term: str) -> List[Tuple[int, bool, List[str]]]:
+        """Index terms matching a query term as (score, in names, terms), grouped by score, best first"""
+        tiers = []
+        for postings, sorted_terms, weight in (
+            (self.names, self._name_terms, NAME_WEIGHT),
+            (self.text, self._text_terms, TEXT_WEIGHT)
+        ):
+            matches = self._expand(term, postings, sorted_terms)
+            # Exact matches outrank prefix matches
+            exact = [match for match in matches if match == term]
+            prefix = [match for match in matches if match != term]
+            in_names = postings is self.names
+            tiers += [(weight * 2, in_names, exact), (weight, in_names, prefix)]
+        return [tier for tier in tiers if tier[2]]
+
+    def _postings(self, in_names: bool, term: str) -> List[int]:
+        return (self.names if in_names else self.text)[term]
+
+    def _entry_set(self, in_names: bool, terms: List[str]) -> Set[int]:
+        """Entries under any of `terms`; single posting lists are kept as sets with the index"""
+        sets = []
+        for term in terms:
+            members = self._members.get((in_names, term))
+            if members is None:
+                members = self._members[(in_names, term)] = set(self._postings(in_names, term))
+            sets.append(members)
+        return sets[0] if len(sets) == 1 else set().union(*sets)
+
+    def _best_ranked(self, tiers: Tuple[Tuple[int, bool, List[str]], ...], count: int, seen: Set[int]) -> List[int]:
+        """Up to `count` best-ranked entries, not in `seen`, found in every one of `tiers`"""
+        sizes = [sum(len(self._postings(in_names, term)) for term in terms) for _, in_names, terms in tiers]
+        order = sorted(range(len(tiers)), key=sizes.__getitem__)
+        smallest = tiers[order[0]]
+        others = [self._entry_set(tiers[i][1], tiers[i][2]) for i in order[1:]]
+
+        if others:
+            # Intersections run in C; only the surviving entries are ranked
+            candidates = self._entry_set(smallest[1], smallest[2]).intersection(*others) - seen
+            if len(candidates) <= count:
+                return list(candidates)
+            # A long walk of the smallest list to find `count` of them costs more than ranking them all
+            if sizes[order[0]] * count > len(candidates) ** 2:
+                return heapq.nsmallest(count, candidates, key=self._rank.__getitem__)
+        else:
+            candidates = None
+
+        found = []
+        lists = [self._postings(smallest[1], term) for term in smallest[2]]
+        for entry_id in heapq.merge(*lists, key=self._rank.__getitem__):
+            if entry_id in seen or entry_id in found:
+                continue
+            if candidates is None or entry_id in candidates:
+                found.append(entry_id)
+                if len(found) == count:
+                    break
+        return found
+
+    def search(self, query: str, limit: int = 20) -> List[Dict[str, Any]]:
+        """Entries matching every word of `query` (by prefix), best first"""
+        terms = [word.lower() for word in WORD_PATTERN.findall(query)]
+        terms = [term for term in terms if term not in STOP_WORDS] or terms
+        if not terms:
+            return []
+
+        term_tiers = [self._tiers(term) for term in dict.fromkeys(terms)]
+        if not all(term_tiers):
+            return []
+
+        # An entry scores the sum of its best tier per term, so taking one tier per term
+        # in order of total score finds every entry at its own score first. Each score
+        # level is ranked on its own, and lookups stop at the level that fills `limit`
+        combinations = sorted(
+            itertools.product(*term_tiers),
+            key=lambda tiers: -sum(score for score, _, _ in tiers)
+        )
+        ranked: List[Tuple[int, int]] = []
+        seen: Set[int] = set()
+        for total, level in itertools.groupby(combinations, key=lambda tiers: sum(score for score, _, _ in tiers)):
+            needed = limit - len(ranked)
+            if needed <= 0:
+                break
+            found: Set[int] = set()
+            for tiers in level:
+                found.update(self._best_ranked(tiers, needed, seen))
+            # Fewer than `needed` means the level was exhausted, so none of it may reappear lower down
+            seen |= found
+            ranked += [(total, entry_id) for entry_id in sorted(found, key=self._rank.__getitem__)[:needed]]
+
+        results = []
+        for total, entry_id in ranked:
+            result = dict(self.entries[entry_id], score=total)
+            if self.doc_url:
+                result['url'] = f"{self.doc_url}#{result['module']}"
+            results.append(result)
+        return results
+
+
+class SearchIndexCache:
+    """Keeps the most recently used search indexes in memory"""
+
+    def __init__(self, max_size: int = 32):
+        self.max_size = max_size
+        self._indexes: 'OrderedDict[str, SearchIndex]' = OrderedDict()
+
+    def get(self, key: str) -> Optional[SearchIndex]:
+        index = self._indexes.get(key)
+        if index is not None:
+            self._indexes.move_to_end(key)
+        return index
+
+    def put(self, key: str, index: SearchIndex):
+        self._indexes[key] = index
+        self._indexes.move_to_end(key)
+        while len(self._indexes) > self.max_size:
+            self._indexes.popitem(last=False)
+
+    def discard(self, key: Optional[str] = None):
+        """Drop one index, or all of them when `key` is None"""
+        if key is None:
+            self._indexes.clear()
+        else:
+            self._indexes.pop(key, None)